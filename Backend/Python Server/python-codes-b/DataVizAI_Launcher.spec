@@ -22,6 +22,7 @@ hiddenimports = [
     'ml_backend.utils.metrics',
     'ml_backend.utils.preprocessing',
     'ml_backend.utils.save_to_cloudflare',
+    'ml_backend.utils.jit',
     
     # ML libraries
     'sklearn.ensemble', 'sklearn.linear_model', 'sklearn.svm',
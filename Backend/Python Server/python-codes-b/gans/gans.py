@@ -64,9 +64,11 @@ app.json_encoder = NumpyEncoder
 
 # Configuration
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-UPLOAD_FOLDER = 'datasets'
-SYNTHETIC_FOLDER = 'synthetic'
-REPORTS_FOLDER = 'reports'
+# Anchored to this file rather than the working directory, which other services in the launcher process share
+BASE_FOLDER = os.path.dirname(os.path.abspath(__file__))
+UPLOAD_FOLDER = os.path.join(BASE_FOLDER, 'datasets')
+SYNTHETIC_FOLDER = os.path.join(BASE_FOLDER, 'synthetic')
+REPORTS_FOLDER = os.path.join(BASE_FOLDER, 'reports')
 
 # Create necessary directories
 for folder in [UPLOAD_FOLDER, SYNTHETIC_FOLDER, REPORTS_FOLDER]:
@@ -14,6 +14,7 @@ from sklearn.cluster import KMeans
 from scipy.stats import skew, kurtosis
 from scipy import stats
 from itertools import combinations
+from collections import Counter
 from datetime import datetime
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
@@ -39,6 +40,20 @@ logger = logging.getLogger(__name__)
 
 warnings.filterwarnings('ignore')
 
+def upper_triangle_abs_values(corr_matrix):
+    """
+    Absolute correlations above the diagonal of a correlation matrix
+    
+    Args:
+        corr_matrix: Square correlation DataFrame (e.g. from DataFrame.corr())
+    
+    Returns:
+        1-D array with one value per column pair, NaN pairs (constant columns) dropped
+    """
+    corr = corr_matrix.to_numpy()
+    values = np.abs(corr[np.triu_indices_from(corr, k=1)])
+    return values[~np.isnan(values)]
+
 class DataQualityAnalyzer:
     def __init__(self, df, target_col=None):
         self.df = df.copy()
@@ -114,16 +129,23 @@ class DataQualityAnalyzer:
 
     def _correlation_metrics(self):
         if len(self.numeric_cols) > 1:
-            corr = self.df[self.numeric_cols].corr().abs()
-            upper = corr.where(np.triu(np.ones(corr.shape), k=1).astype(bool))
-            self.metrics['high_correlation_pairs'] = (upper > 0.8).sum().sum()
-            self.metrics['mean_abs_correlation'] = upper.stack().mean()
+            pair_corr = upper_triangle_abs_values(self.df[self.numeric_cols].corr())
+            self.metrics['high_correlation_pairs'] = int(np.count_nonzero(pair_corr > 0.8))
+            self.metrics['mean_abs_correlation'] = pair_corr.mean() if pair_corr.size > 0 else np.nan
 
     def _distribution_metrics(self):
-        skew_vals = [abs(skew(self.df[col].dropna())) for col in self.numeric_cols if self.df[col].nunique() > 5]
-        kurt_vals = [abs(kurtosis(self.df[col].dropna()) - 3) for col in self.numeric_cols if self.df[col].nunique() > 5]
-        self.metrics['mean_abs_skewness'] = np.mean(skew_vals) if skew_vals else np.nan
-        self.metrics['mean_abs_kurtosis'] = np.mean(kurt_vals) if kurt_vals else np.nan
+        n_unique = self.df[self.numeric_cols].nunique()
+        dist_cols = n_unique.index[n_unique > 5]
+        if len(dist_cols) == 0:
+            self.metrics['mean_abs_skewness'] = np.nan
+            self.metrics['mean_abs_kurtosis'] = np.nan
+            return
+        # One call per statistic over all columns; 'omit' skips each column's NaNs like dropna did
+        values = self.df[dist_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        skew_vals = np.abs(skew(values, axis=0, nan_policy='omit'))
+        kurt_vals = np.abs(kurtosis(values, axis=0, nan_policy='omit') - 3)
+        self.metrics['mean_abs_skewness'] = np.mean(skew_vals)
+        self.metrics['mean_abs_kurtosis'] = np.mean(kurt_vals)
 
     def _data_freshness(self):
         if len(self.date_cols) > 0:
@@ -423,28 +445,42 @@ class DataQualityMetrics:
             duplicate_count = int(df.duplicated().sum())
             duplicate_pct = float((duplicate_count / n_rows * 100) if n_rows > 0 else 0.0)
 
-            # Invalid Data (count columns with type mismatch)
+            # Invalid Data, Data Type Mismatch and Inconsistent Formats share one pass per column
             mismatch_count = 0
+            dtm_count = 0
+            dtm_total = 0
+            incons_count = 0
             for col in df.columns:
-                if df[col].dtype == object:
+                column = df[col]
+                is_object = column.dtype == object
+
+                # Invalid Data (count columns with type mismatch)
+                if is_object:
                     try:
-                        pd.to_numeric(df[col])
+                        pd.to_numeric(column)
                     except:
                         mismatch_count += 1
-            mismatch_pct = float((mismatch_count / n_cols * 100) if n_cols > 0 else 0.0)
 
-            # Data Type Mismatch (per value, not just per column)
-            dtm_count = 0
-            dtm_total = 0
-            for col in df.columns:
-                series = df[col].dropna()
-                if len(series) == 0:
+                # Data Type Mismatch (per value, not just per column): values not of the dominant type.
+                # Numeric, datetime and string dtypes hold a single Python type, so only object and
+                # categorical columns need their values' types counted
+                if not is_object and not isinstance(column.dtype, pd.CategoricalDtype):
+                    dtm_total += int(column.count())
+                    continue
+
+                values = column.dropna().to_numpy(dtype=object)
+                if values.size == 0:
                     continue
-                dominant_type = series.map(type).mode()[0]
-                mismatches = (series.map(type) != dominant_type).sum()
-                dtm_count += mismatches
-                dtm_total += len(series)
+                type_counts = Counter(map(type, values))
+                dtm_count += values.size - max(type_counts.values())
+                dtm_total += values.size
+
+                # Inconsistent Formats (count columns with >1 dtype or format)
+                if is_object and len(type_counts) > 1:
+                    incons_count += 1
+            mismatch_pct = float((mismatch_count / n_cols * 100) if n_cols > 0 else 0.0)
             dtm_pct = float((dtm_count / dtm_total * 100) if dtm_total > 0 else 0.0)
+            incons_pct = float((incons_count / n_cols * 100) if n_cols > 0 else 0.0)
 
             # Outlier Count (IsolationForest)
             outlier_count = 0
@@ -455,15 +491,6 @@ class DataQualityMetrics:
                 outlier_count = int((preds == -1).sum())
             outlier_pct = float((outlier_count / n_rows * 100) if n_rows > 0 else 0.0)
 
-            # Inconsistent Formats (count columns with >1 dtype or format)
-            incons_count = 0
-            for col in df.columns:
-                if df[col].dtype == object:
-                    unique_types = set(type(x) for x in df[col].dropna())
-                    if len(unique_types) > 1:
-                        incons_count += 1
-            incons_pct = float((incons_count / n_cols * 100) if n_cols > 0 else 0.0)
-
             # Cardinality/Uniqueness (categorical columns)
             cardinality = 0
             if categorical_cols:
@@ -495,57 +522,58 @@ class DataQualityMetrics:
             # Feature Correlation (mean absolute Pearson correlation)
             feature_corr = 0.0
             if len(numeric_cols) > 1:
-                corr_matrix = df[numeric_cols].corr().abs()
-                upper = corr_matrix.where(np.triu(np.ones(corr_matrix.shape), k=1).astype(bool))
-                vals = upper.stack().values
+                vals = upper_triangle_abs_values(df[numeric_cols].corr())
                 if len(vals) > 0:
                     feature_corr = float(np.mean(vals))
             feature_corr_pct = float(feature_corr * 100)
 
-            # Low Variance Features (variance < 0.01)
+            # Numeric columns: mean, median and std are computed once per column and shared by
+            # Low Variance Features, Mean-Median Drift, Range Violations and Statistical Summaries
             low_var_count = 0
-            for col in numeric_cols:
-                series = df[col].dropna()
-                if len(series) > 1 and np.var(series) < 0.01:
-                    low_var_count += 1
-            low_var_total = len(numeric_cols)
-            low_var_pct = float((low_var_count / low_var_total * 100) if low_var_total > 0 else 0.0)
-
-            # Mean-Median Drift (mean abs(mean-median)/std)
             mm_drift = 0.0
             mm_count = 0
-            for col in numeric_cols:
-                series = df[col].dropna()
-                if len(series) > 1 and series.std() > 0:
-                    mm_drift += abs(series.mean() - series.median()) / series.std()
-                    mm_count += 1
-            mm_drift_val = float((mm_drift / mm_count) if mm_count > 0 else 0.0)
-            mm_drift_pct = float(mm_drift_val * 100)
-
-            # Range Violations (values outside mean ± 3*std)
             range_viol_count = 0
             range_viol_total = 0
-            for col in numeric_cols:
-                series = df[col].dropna()
-                if len(series) > 1:
-                    mean = series.mean()
-                    std = series.std()
-                    lower = mean - 3 * std
-                    upper = mean + 3 * std
-                    range_viol_count += ((series < lower) | (series > upper)).sum()
-                    range_viol_total += len(series)
-            range_viol_pct = float((range_viol_count / range_viol_total * 100) if range_viol_total > 0 else 0.0)
-
-            # Statistical Summaries (optional, if frontend expects it)
             stats = {}
             for col in numeric_cols:
-                series = df[col].dropna()
-                if len(series) > 0:
-                    stats[col] = {
-                        'mean': float(series.mean()),
-                        'median': float(series.median()),
-                        'std': float(series.std())
-                    }
+                values = df[col].dropna().to_numpy(dtype=np.float64)
+                n_values = values.size
+                if n_values == 0:
+                    continue
+                mean = values.mean()
+                median = np.median(values)
+                std = np.nan  # Sample std is undefined for a single value
+
+                if n_values > 1:
+                    deviations = values - mean
+                    sum_squares = np.dot(deviations, deviations)
+                    std = np.sqrt(sum_squares / (n_values - 1))
+
+                    # Low Variance Features (population variance < 0.01)
+                    if sum_squares / n_values < 0.01:
+                        low_var_count += 1
+
+                    # Mean-Median Drift (mean abs(mean-median)/std)
+                    if std > 0:
+                        mm_drift += abs(mean - median) / std
+                        mm_count += 1
+
+                    # Range Violations (values outside mean ± 3*std)
+                    range_viol_count += int(np.count_nonzero((values < mean - 3 * std) | (values > mean + 3 * std)))
+                    range_viol_total += n_values
+
+                # Statistical Summaries (optional, if frontend expects it)
+                stats[col] = {
+                    'mean': float(mean),
+                    'median': float(median),
+                    'std': float(std)
+                }
+
+            low_var_total = len(numeric_cols)
+            low_var_pct = float((low_var_count / low_var_total * 100) if low_var_total > 0 else 0.0)
+            mm_drift_val = float((mm_drift / mm_count) if mm_count > 0 else 0.0)
+            mm_drift_pct = float(mm_drift_val * 100)
+            range_viol_pct = float((range_viol_count / range_viol_total * 100) if range_viol_total > 0 else 0.0)
 
             metrics = {
                 'Missing_Values': {'count': missing_count, 'total': n_rows * n_cols, 'pct': missing_pct},
@@ -17,6 +17,7 @@ from flask import Flask, request, jsonify, send_file, Response
 from flask_cors import CORS
 import pandas as pd
 import importlib
+import threading
 import joblib
 import uuid
 import json
@@ -51,8 +52,9 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
-# Change working directory to the ml_backend directory
-os.chdir(current_dir)
+# Model files live next to this module. Paths are absolute instead of chdir-ing here:
+# the working directory is process-wide, and the launcher runs other services in this process
+SAVED_MODELS_DIR = os.path.join(current_dir, 'saved_models')
 
 # Helper function to convert NumPy types to Python native types
 def convert_numpy_types(obj):
@@ -75,7 +77,11 @@ app = Flask(__name__)
 CORS(app)
 
 # Ensure saved_models directory exists
-os.makedirs('saved_models', exist_ok=True)
+os.makedirs(SAVED_MODELS_DIR, exist_ok=True)
+
+# Compile the Numba kernels in the background at startup instead of on the first training request
+from utils.jit import warm_up_kernels
+threading.Thread(target=warm_up_kernels, daemon=True).start()
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -213,7 +219,7 @@ def train_model():
         
         # Generate unique model ID and save
         model_id = str(uuid.uuid4())
-        model_path = f"saved_models/{model_id}.pkl"
+        model_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}.pkl")
         joblib.dump(model, model_path)
         
         # Save metadata with enhanced information
@@ -231,7 +237,7 @@ def train_model():
             "csv_url": csv_url
         }
         
-        metadata_path = f"saved_models/{model_id}_metadata.json"
+        metadata_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}_metadata.json")
         with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2, cls=NumpyJSONEncoder)
         
@@ -278,14 +284,14 @@ def predict():
             return jsonify({"error": "Missing model_id or data"}), 400
         
         # Load model
-        model_path = f"saved_models/{model_id}.pkl"
+        model_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}.pkl")
         if not os.path.exists(model_path):
             return jsonify({"error": "Model not found"}), 404
         
         model = joblib.load(model_path)
         
         # Load metadata
-        metadata_path = f"saved_models/{model_id}_metadata.json"
+        metadata_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}_metadata.json")
         with open(metadata_path, 'r') as f:
             metadata = json.load(f)
         
@@ -341,8 +347,8 @@ def save_model_to_cloud():
         if not user_id:
             return jsonify({"error": "Missing user_id"}), 400
         
-        model_path = f"saved_models/{model_id}.pkl"
-        metadata_path = f"saved_models/{model_id}_metadata.json"
+        model_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}.pkl")
+        metadata_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}_metadata.json")
         
         if not os.path.exists(model_path):
             return jsonify({"error": "Model not found"}), 404
@@ -639,7 +645,7 @@ def list_user_dataset_models(user_id, dataset_name):
 def get_model_info(model_id):
     """Get information about a specific model"""
     try:
-        metadata_path = f"saved_models/{model_id}_metadata.json"
+        metadata_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}_metadata.json")
         
         if not os.path.exists(metadata_path):
             return jsonify({"error": "Model not found"}), 404
@@ -656,8 +662,8 @@ def get_model_info(model_id):
 def delete_model(model_id):
     """Delete a model and its metadata"""
     try:
-        model_path = f"saved_models/{model_id}.pkl"
-        metadata_path = f"saved_models/{model_id}_metadata.json"
+        model_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}.pkl")
+        metadata_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}_metadata.json")
         
         deleted_files = []
         if os.path.exists(model_path):
@@ -684,7 +690,7 @@ def delete_model(model_id):
 def download_model(model_id):
     """Download a trained model (.pkl file)"""
     try:
-        model_path = f"saved_models/{model_id}.pkl"
+        model_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}.pkl")
         
         if not os.path.exists(model_path):
             return jsonify({"error": "Model file not found"}), 404
@@ -703,7 +709,7 @@ def download_model(model_id):
 def get_training_code(model_id):
     """Get the Python training code for the model"""
     try:
-        metadata_path = f"saved_models/{model_id}_metadata.json"
+        metadata_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}_metadata.json")
         
         if not os.path.exists(metadata_path):
             return jsonify({"error": "Model metadata not found"}), 404
@@ -962,8 +968,8 @@ print("Model saved successfully!")
 def predict_with_model(model_id):
     """Make predictions using a trained model"""
     try:
-        model_path = f"saved_models/{model_id}.pkl"
-        metadata_path = f"saved_models/{model_id}_metadata.json"
+        model_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}.pkl")
+        metadata_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}_metadata.json")
         
         if not os.path.exists(model_path) or not os.path.exists(metadata_path):
             return jsonify({"error": "Model or metadata not found"}), 404
@@ -1069,8 +1075,8 @@ def predict_with_model(model_id):
 def test_model_on_data(model_id):
     """Test model on provided test data"""
     try:
-        model_path = f"saved_models/{model_id}.pkl"
-        metadata_path = f"saved_models/{model_id}_metadata.json"
+        model_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}.pkl")
+        metadata_path = os.path.join(SAVED_MODELS_DIR, f"{model_id}_metadata.json")
         
         if not os.path.exists(model_path) or not os.path.exists(metadata_path):
             return jsonify({"error": "Model or metadata not found"}), 404
@@ -1233,7 +1239,7 @@ def save_ai_analysis_metadata():
         
         # Create temporary JSON file for AI analysis
         temp_filename = f"ai_analysis_{model_id}.json"
-        temp_path = f"saved_models/{temp_filename}"
+        temp_path = os.path.join(SAVED_MODELS_DIR, f"{temp_filename}")
         
         # Save metadata to temporary file
         with open(temp_path, 'w') as f:
@@ -4,6 +4,30 @@ import numpy as np
 import pandas as pd
 from utils.metrics import calculate_clustering_metrics, get_model_performance_summary
 from utils.preprocessing import preprocess_data
+from utils.jit import find_knee
+
+# GPU backend (RAPIDS cuML) is optional
+try:
+    import cudf
+    from cuml.cluster import DBSCAN as cuDBSCAN
+    CUML_AVAILABLE = True
+except ImportError:
+    CUML_AVAILABLE = False
+
+# Up to this many samples the k-distance graph is computed with a dense matrix product
+BRUTE_FORCE_MAX_SAMPLES = 20000
+# Memory budget for one block of pairwise squared distances
+DISTANCE_BLOCK_BYTES = 256 * 1024 * 1024
+# From this many samples DBSCAN runs on the GPU when cuML is installed
+GPU_MIN_SAMPLES = 50000
+# Metrics cuML's DBSCAN supports
+CUML_METRICS = {'euclidean', 'cosine'}
+# Datasets larger than this estimate eps from the k-distances of a uniform sample
+EPS_SAMPLE_SIZE = 20000
+# KD-trees degrade towards brute force in high dimensions; switch to a ball tree above this
+KD_TREE_MAX_DIMENSIONS = 20
+# Metrics supported by sklearn's KDTree
+KD_TREE_METRICS = {'euclidean', 'l2', 'minkowski', 'p', 'manhattan', 'cityblock', 'l1', 'chebyshev', 'infinity'}
 
 def train_model(dataframe, features, hyperparams=None):
     """
@@ -28,7 +52,7 @@ def train_model(dataframe, features, hyperparams=None):
         'algorithm': 'auto',
         'leaf_size': 30,
         'p': None,
-        'n_jobs': None
+        'n_jobs': -1
     }
     
     # Update with provided hyperparameters
@@ -45,21 +69,49 @@ def train_model(dataframe, features, hyperparams=None):
         }
     )
     
-    # Prepare features
+    # Prepare features; the ndarray view serves every positional access below
     X = processed_df[features]
+    X_values = X.to_numpy(dtype=np.float64)
+    
+    # Pick the neighbor search tree from the data shape unless it was given explicitly
+    if 'algorithm' not in hyperparams:
+        default_params['algorithm'] = choose_tree_algorithm(X.shape[1], default_params['metric'])
+    if 'leaf_size' not in hyperparams:
+        default_params['leaf_size'] = max(10, min(40, int(np.log2(max(len(X), 2)) * 2)))
+    
+    # Large problems go to the GPU; small euclidean ones use dense float32 distances;
+    # otherwise build one tree for every neighbor query
+    use_gpu = CUML_AVAILABLE and len(X) >= GPU_MIN_SAMPLES and default_params['metric'] in CUML_METRICS
+    use_dense_distances = default_params['metric'] == 'euclidean' and len(X) <= BRUTE_FORCE_MAX_SAMPLES
+    nbrs = None if use_gpu or use_dense_distances else build_neighbor_index(X, default_params)
     
     # Auto-determine eps if not specified
     if 'eps' not in hyperparams:
-        optimal_eps = estimate_optimal_eps(X, k=default_params['min_samples'])
+        optimal_eps = estimate_optimal_eps(X, k=default_params['min_samples'], nbrs=nbrs)
         default_params['eps'] = optimal_eps
     
-    # Train the model
-    model = DBSCAN(**default_params)
-    cluster_labels = model.fit_predict(X)
+    eps_graph = None
+    if use_gpu:
+        model, cluster_labels = fit_dbscan_gpu(X, default_params)
+    else:
+        # Train the model on the precomputed eps neighborhoods
+        if use_dense_distances:
+            eps_graph = compute_radius_graph(X_values, default_params['eps'])
+        else:
+            # Without a query X each point is excluded from its own neighborhood
+            eps_graph = nbrs.radius_neighbors_graph(radius=default_params['eps'], mode='distance')
+        model = DBSCAN(**{**default_params, 'metric': 'precomputed', 'algorithm': 'brute'})
+        cluster_labels = model.fit_predict(eps_graph)
+        # Leave the fitted model as if it had been trained on the features directly
+        model.set_params(metric=default_params['metric'], algorithm=default_params['algorithm'])
+        model.components_ = X_values[model.core_sample_indices_]
     
     # Calculate metrics (exclude noise points for some metrics)
-    valid_mask = cluster_labels != -1
-    if np.sum(valid_mask) > 1:  # Need at least 2 non-noise points
+    n_samples = len(X)
+    noise_mask = cluster_labels == -1
+    n_noise = int(noise_mask.sum())
+    valid_mask = ~noise_mask
+    if n_samples - n_noise > 1:  # Need at least 2 non-noise points
         metrics = calculate_clustering_metrics(X[valid_mask], cluster_labels[valid_mask])
     else:
         metrics = {'error': 'All points classified as noise'}
@@ -68,90 +120,78 @@ def train_model(dataframe, features, hyperparams=None):
     metrics['model_type'] = 'dbscan'
     metrics['hyperparameters'] = default_params
     metrics['feature_count'] = len(features)
-    metrics['total_samples'] = len(X)
+    metrics['total_samples'] = n_samples
     
     # Add DBSCAN-specific metrics
-    unique_labels = np.unique(cluster_labels)
-    n_clusters = len(unique_labels) - (1 if -1 in unique_labels else 0)
-    n_noise = np.sum(cluster_labels == -1)
+    unique_labels, label_counts = np.unique(cluster_labels, return_counts=True)
+    n_clusters = len(unique_labels) - (1 if n_noise > 0 else 0)
     
     metrics['num_clusters'] = n_clusters
-    metrics['num_noise_points'] = int(n_noise)
-    metrics['noise_ratio'] = float(n_noise / len(X))
+    metrics['num_noise_points'] = n_noise
+    metrics['noise_ratio'] = float(n_noise / n_samples)
     metrics['cluster_labels_unique'] = unique_labels.tolist()
     
-    # Calculate cluster statistics
+    # Calculate cluster statistics with a single groupby instead of masking per cluster
     cluster_stats = {}
-    for label in unique_labels:
+    grouped = X.groupby(cluster_labels)[features].agg(['mean', 'std'])
+    cluster_means = grouped.xs('mean', axis=1, level=1).to_numpy()
+    cluster_stds = grouped.xs('std', axis=1, level=1).to_numpy()
+    
+    # groupby sorts its keys, so rows line up with np.unique's labels and counts
+    for pos, (label, size) in enumerate(zip(unique_labels.tolist(), label_counts.tolist())):
         if label == -1:
             # Noise points
             cluster_stats['noise'] = {
-                'size': int(np.sum(cluster_labels == -1)),
-                'percentage': float(np.sum(cluster_labels == -1) / len(X) * 100)
+                'size': size,
+                'percentage': float(size / n_samples * 100)
             }
         else:
             # Regular clusters
-            cluster_mask = cluster_labels == label
-            cluster_data = X[cluster_mask]
-            
             cluster_stats[f'cluster_{label}'] = {
-                'size': int(len(cluster_data)),
-                'percentage': float(len(cluster_data) / len(X) * 100),
-                'feature_means': {
-                    feature: float(cluster_data[feature].mean()) 
-                    for feature in features
-                },
-                'feature_stds': {
-                    feature: float(cluster_data[feature].std()) 
-                    for feature in features
-                }
+                'size': size,
+                'percentage': float(size / n_samples * 100),
+                'feature_means': dict(zip(features, cluster_means[pos].tolist())),
+                'feature_stds': dict(zip(features, cluster_stds[pos].tolist()))
             }
     
     metrics['cluster_statistics'] = cluster_stats
     
     # Add cluster assignments to dataframe (first 100 samples for preview)
-    sample_size = min(100, len(X))
+    sample_size = min(100, n_samples)
     cluster_preview = pd.DataFrame({
         'sample_index': range(sample_size),
         'cluster': cluster_labels[:sample_size].tolist(),
-        'is_noise': (cluster_labels[:sample_size] == -1).tolist()
+        'is_noise': noise_mask[:sample_size].tolist()
     })
     
     # Add original feature values for preview
-    for feature in features[:5]:  # Limit to first 5 features
-        cluster_preview[feature] = X[feature].iloc[:sample_size].tolist()
+    preview_features = features[:5]  # Limit to first 5 features
+    cluster_preview[preview_features] = X_values[:sample_size, :len(preview_features)]
     
     metrics['cluster_preview'] = cluster_preview.to_dict(orient='records')
     
-    # Calculate cluster density (average distance to k-th nearest neighbor)
+    # Calculate cluster density (average distance between core samples inside the eps ball)
     if n_clusters > 0:
-        from sklearn.neighbors import NearestNeighbors
-        k = min(default_params['min_samples'], len(X) - 1)
+        # Core samples carry the cluster structure; border and noise points are skipped
+        core_idx = model.core_sample_indices_
+        if eps_graph is not None:
+            core_graph = eps_graph[core_idx][:, core_idx]
+        else:
+            core_graph = build_neighbor_index(X_values[core_idx], default_params).radius_neighbors_graph(mode='distance')
+        neighbor_counts = np.diff(core_graph.indptr)
+        neighbor_sums = np.asarray(core_graph.sum(axis=1)).ravel()
         
-        if k > 0:
-            nbrs = NearestNeighbors(n_neighbors=k+1)
-            # Safely fit the model
-            try:
-                fit_params = {}
-                nbrs.fit(X, **fit_params)
-            except TypeError as e:
-                # If any parameter is not supported, try without additional parameters
-                print(f"⚠️ NearestNeighbors fit with parameters failed: {str(e)}")
-                print("   Falling back to standard fit...")
-                nbrs.fit(X)
-                
-            distances, _ = nbrs.kneighbors(X)
-            
-            cluster_densities = {}
-            for label in unique_labels:
-                if label != -1:
-                    cluster_mask = cluster_labels == label
-                    cluster_distances = distances[cluster_mask, 1:]  # Exclude self
-                    if len(cluster_distances) > 0:
-                        avg_density = float(np.mean(cluster_distances))
-                        cluster_densities[f'cluster_{label}'] = avg_density
-            
-            metrics['cluster_densities'] = cluster_densities
+        has_neighbors = neighbor_counts > 0
+        mean_dist_per_point = neighbor_sums[has_neighbors] / neighbor_counts[has_neighbors]
+        point_labels = cluster_labels[core_idx][has_neighbors]
+        density_sums = np.bincount(point_labels, weights=mean_dist_per_point)
+        density_counts = np.bincount(point_labels)
+        
+        cluster_densities = {}
+        for label in np.flatnonzero(density_counts):
+            cluster_densities[f'cluster_{label}'] = float(density_sums[label] / density_counts[label])
+        
+        metrics['cluster_densities'] = cluster_densities
     
     # Add performance summary
     if 'error' not in metrics:
@@ -171,46 +211,77 @@ def train_model(dataframe, features, hyperparams=None):
     
     return model, metrics
 
-def estimate_optimal_eps(X, k=5):
+def fit_dbscan_gpu(X, params):
+    """
+    Fit DBSCAN on the GPU with cuML
+    
+    The result is returned as a fitted sklearn DBSCAN so saved models load
+    on machines without a GPU.
+    
+    Args:
+        X: Feature DataFrame
+        params: DBSCAN hyperparameters
+    
+    Returns:
+        Fitted sklearn DBSCAN model, cluster labels as a numpy array
+    """
+    gpu_model = cuDBSCAN(
+        eps=params['eps'],
+        min_samples=params['min_samples'],
+        metric=params['metric'],
+        calc_core_sample_indices=True,
+        output_type='numpy'
+    )
+    cluster_labels = np.asarray(gpu_model.fit_predict(cudf.DataFrame.from_pandas(X)), dtype=np.int64)
+    
+    model = DBSCAN(**params)
+    model.labels_ = cluster_labels
+    model.core_sample_indices_ = np.asarray(gpu_model.core_sample_indices_, dtype=np.int64)
+    model.components_ = X.to_numpy()[model.core_sample_indices_]
+    model.n_features_in_ = X.shape[1]
+    
+    return model, cluster_labels
+
+def estimate_optimal_eps(X, k=5, nbrs=None):
     """
     Estimate optimal eps parameter using k-distance graph
     
     Args:
         X: Feature matrix
         k: Number of nearest neighbors to consider
+        nbrs: Optional NearestNeighbors index already fitted on X
     
     Returns:
         Estimated optimal eps value
     """
     try:
-        from sklearn.neighbors import NearestNeighbors
-        
         k = min(k, len(X) - 1)
         if k <= 0:
             return 0.5
         
-        # Calculate k-distance with safe parameter handling
-        nbrs = NearestNeighbors(n_neighbors=k+1)
-        try:
-            fit_params = {}
-            nbrs.fit(X, **fit_params)
-        except TypeError as e:
-            # If any parameter is not supported, try without additional parameters
-            print(f"⚠️ NearestNeighbors fit with parameters failed: {str(e)}")
-            print("   Falling back to standard fit...")
-            nbrs.fit(X)
-            
-        distances, _ = nbrs.kneighbors(X)
+        if nbrs is None and len(X) <= BRUTE_FORCE_MAX_SAMPLES:
+            # Dense float32 GEMM beats a tree query at this size
+            k_distances = compute_k_distances(X, k)
+        else:
+            if nbrs is None:
+                from sklearn.neighbors import NearestNeighbors
+                nbrs = NearestNeighbors().fit(X)
+            if len(X) > EPS_SAMPLE_SIZE:
+                # The elbow only depends on the k-distance distribution, so query a uniform sample
+                sample_idx = np.random.default_rng(0).choice(len(X), EPS_SAMPLE_SIZE, replace=False)
+                distances, _ = nbrs.kneighbors(X.iloc[sample_idx], n_neighbors=k + 1)
+                k_distances = distances[:, k]
+            else:
+                # Without a query X each point is excluded from its own neighbors
+                distances, _ = nbrs.kneighbors(n_neighbors=k)
+                k_distances = distances[:, k - 1]
         
-        # Sort k-distances in descending order
-        k_distances = np.sort(distances[:, k])[::-1]
+        # Sort k-distances in ascending order
+        k_distances = np.sort(k_distances)
         
         # Find the elbow point (knee point)
         if len(k_distances) >= 3:
-            # Simple elbow detection using gradient
-            gradients = np.gradient(k_distances)
-            elbow_point = np.argmax(gradients)
-            optimal_eps = k_distances[elbow_point]
+            optimal_eps = k_distances[find_knee(k_distances)]
             
             # Ensure reasonable bounds
             optimal_eps = max(0.1, min(optimal_eps, 2.0))
@@ -221,6 +292,126 @@ def estimate_optimal_eps(X, k=5):
     
     return 0.5  # Default fallback
 
+def choose_tree_algorithm(n_dimensions, metric):
+    """
+    Choose the neighbor search structure for the data dimensionality and metric
+    
+    Args:
+        n_dimensions: Number of features
+        metric: Distance metric name
+    
+    Returns:
+        Algorithm name accepted by DBSCAN and NearestNeighbors
+    """
+    if n_dimensions <= KD_TREE_MAX_DIMENSIONS and metric in KD_TREE_METRICS:
+        return 'kd_tree'
+    if callable(metric) or metric in KD_TREE_METRICS:
+        return 'ball_tree'
+    # Let sklearn fall back to brute force for metrics the trees do not support
+    return 'auto'
+
+def build_neighbor_index(X, params):
+    """
+    Fit a NearestNeighbors index matching the DBSCAN neighbor settings
+    
+    Args:
+        X: Feature matrix
+        params: DBSCAN hyperparameters
+    
+    Returns:
+        Fitted NearestNeighbors instance
+    """
+    from sklearn.neighbors import NearestNeighbors
+    
+    nbrs_params = {
+        'radius': params['eps'],
+        'metric': params['metric'],
+        'algorithm': params['algorithm'],
+        'leaf_size': params['leaf_size'],
+        'n_jobs': params['n_jobs']
+    }
+    if params.get('p') is not None:
+        nbrs_params['p'] = params['p']
+    
+    return NearestNeighbors(**nbrs_params).fit(X)
+
+def iter_sq_distance_blocks(X, block_bytes=DISTANCE_BLOCK_BYTES):
+    """
+    Yield row blocks of pairwise squared Euclidean distances in float32
+    
+    Uses the expansion ||x - y||^2 = ||x||^2 + ||y||^2 - 2 x.y so the heavy
+    lifting is a float32 matrix product. Each sample's distance to itself is
+    set to inf so it never counts as its own neighbor.
+    
+    Args:
+        X: Feature matrix
+        block_bytes: Approximate memory budget for one block of squared distances
+    
+    Yields:
+        (start, stop, squared distances of rows start:stop to all samples)
+    """
+    X32 = np.ascontiguousarray(X, dtype=np.float32)
+    n_samples = X32.shape[0]
+    sq_norms = np.einsum('ij,ij->i', X32, X32)
+    block_rows = max(1, block_bytes // (4 * n_samples))
+    
+    for start in range(0, n_samples, block_rows):
+        stop = min(start + block_rows, n_samples)
+        sq_dist = X32[start:stop] @ X32.T
+        sq_dist *= -2
+        sq_dist += sq_norms[start:stop, None]
+        sq_dist += sq_norms[None, :]
+        np.maximum(sq_dist, 0, out=sq_dist)
+        rows = np.arange(stop - start)
+        sq_dist[rows, rows + start] = np.inf
+        yield start, stop, sq_dist
+
+def compute_k_distances(X, k, block_bytes=DISTANCE_BLOCK_BYTES):
+    """
+    Compute each sample's Euclidean distance to its k-th nearest other sample
+    
+    Args:
+        X: Feature matrix
+        k: Neighbor rank (1 = nearest other sample)
+        block_bytes: Approximate memory budget for one block of squared distances
+    
+    Returns:
+        Array of k-th nearest neighbor distances, one per sample
+    """
+    kth_sq_dist = np.empty(len(X), dtype=np.float32)
+    for start, stop, sq_dist in iter_sq_distance_blocks(X, block_bytes):
+        kth_sq_dist[start:stop] = np.partition(sq_dist, k - 1, axis=1)[:, k - 1]
+    
+    return np.sqrt(kth_sq_dist)
+
+def compute_radius_graph(X, radius, block_bytes=DISTANCE_BLOCK_BYTES):
+    """
+    Build a sparse graph of Euclidean distances between samples within radius
+    
+    Args:
+        X: Feature matrix
+        radius: Neighborhood radius (DBSCAN eps)
+        block_bytes: Approximate memory budget for one block of squared distances
+    
+    Returns:
+        CSR matrix of neighbor distances, excluding each sample itself
+    """
+    from scipy.sparse import csr_matrix
+    
+    sq_radius = np.float32(radius) ** 2
+    rows, cols, dists = [], [], []
+    for start, _, sq_dist in iter_sq_distance_blocks(X, block_bytes):
+        block_rows, block_cols = np.nonzero(sq_dist <= sq_radius)
+        rows.append(block_rows + start)
+        cols.append(block_cols)
+        dists.append(np.sqrt(sq_dist[block_rows, block_cols]))
+    
+    n_samples = len(X)
+    return csr_matrix(
+        (np.concatenate(dists), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(n_samples, n_samples)
+    )
+
 def get_model_info():
     """
     Get information about this model
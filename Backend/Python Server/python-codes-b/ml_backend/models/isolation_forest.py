@@ -15,6 +15,9 @@ except ImportError as e:
     def preprocess_data(df, features, target=None, preprocessing_steps=None):
         return df, None, None
 
+# Memory budget for the stacked permuted copies scored in one decision_function call
+PERMUTATION_BATCH_BYTES = 256 * 1024 * 1024
+
 def train_model(dataframe, features, hyperparams=None):
     """
     Train an Isolation Forest model for anomaly detection
@@ -37,7 +40,7 @@ def train_model(dataframe, features, hyperparams=None):
         'contamination': 0.1,
         'max_features': 1.0,
         'bootstrap': False,
-        'n_jobs': None,
+        'n_jobs': -1,
         'random_state': 42,
         'verbose': 0
     }
@@ -56,17 +59,21 @@ def train_model(dataframe, features, hyperparams=None):
         }
     )
     
-    # Prepare features
+    # Prepare features as one float64 matrix; only coerce column by column if the cast fails
     X = processed_df[features]
+    try:
+        X_values = X.to_numpy(dtype=np.float64)
+    except (ValueError, TypeError):
+        X_values = X.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
     
-    # Ensure all data is numeric and handle any remaining issues
-    for feature in features:
-        if feature in X.columns:
-            # Convert to numeric, coerce errors to NaN
-            X[feature] = pd.to_numeric(X[feature], errors='coerce')
-    
-    # Fill any remaining NaN values
-    X = X.fillna(X.mean())
+    # Fill any remaining NaN values with the column means
+    nan_mask = np.isnan(X_values)
+    if nan_mask.any():
+        with np.errstate(invalid='ignore', divide='ignore'):
+            column_means = np.where(nan_mask, 0.0, X_values).sum(axis=0) / (~nan_mask).sum(axis=0)
+        nan_rows, nan_cols = np.nonzero(nan_mask)
+        X_values[nan_rows, nan_cols] = column_means[nan_cols]
+    X = pd.DataFrame(X_values, columns=X.columns, index=X.index)
     
     # Ensure we have enough data points
     if len(X) < 2:
@@ -86,11 +93,13 @@ def train_model(dataframe, features, hyperparams=None):
     # In real scenarios, you might have some known anomalies
     y_true = np.ones(len(X))  # All normal points
     
+    # Sort the scores once; the threshold, quartiles and extremes are all read from it
+    sorted_scores = np.sort(anomaly_scores)
+    
     # If contamination rate suggests some anomalies, mark lowest scoring points as anomalies
     contamination_rate = default_params['contamination']
     if contamination_rate > 0 and contamination_rate < 1:
-        n_anomalies = int(len(X) * contamination_rate)
-        anomaly_threshold = np.percentile(anomaly_scores, contamination_rate * 100)
+        anomaly_threshold = sorted_percentile(sorted_scores, contamination_rate * 100)
         y_true[anomaly_scores <= anomaly_threshold] = -1
     
     # Calculate metrics
@@ -120,13 +129,13 @@ def train_model(dataframe, features, hyperparams=None):
     metrics['anomaly_scores'] = {
         'mean': float(np.mean(anomaly_scores)),
         'std': float(np.std(anomaly_scores)),
-        'min': float(np.min(anomaly_scores)),
-        'max': float(np.max(anomaly_scores)),
+        'min': float(sorted_scores[0]),
+        'max': float(sorted_scores[-1]),
         'threshold': float(model.threshold_) if hasattr(model, 'threshold_') else None
     }
     
     # Quartile analysis of anomaly scores
-    quartiles = np.percentile(anomaly_scores, [25, 50, 75])
+    quartiles = sorted_percentile(sorted_scores, np.array([25, 50, 75]))
     metrics['score_quartiles'] = {
         'q1': float(quartiles[0]),
         'median': float(quartiles[1]),
@@ -146,65 +155,61 @@ def train_model(dataframe, features, hyperparams=None):
     # Add sample results (ALL samples for complete preview)
     # Changed from limiting to 100 samples to include all data points
     sample_size = len(X)  # Use all samples instead of limiting to 100
-    anomaly_preview = pd.DataFrame({
-        'sample_index': range(sample_size),
-        'anomaly_score': anomaly_scores.tolist(),
-        'is_anomaly': (anomaly_labels == -1).tolist(),
-        'anomaly_label': anomaly_labels.tolist(),
-        'anomaly': anomaly_labels.tolist()  # Add anomaly column for consistency with frontend
-    })
+    anomaly_labels_compact = anomaly_labels.astype(np.int8)
+    preview_columns = {
+        'sample_index': np.arange(sample_size),
+        'anomaly_score': anomaly_scores,
+        'is_anomaly': anomaly_labels == -1,
+        'anomaly_label': anomaly_labels_compact,
+        'anomaly': anomaly_labels_compact  # Add anomaly column for consistency with frontend
+    }
     
-    # Add original feature values for preview (all features)
-    for feature in features:  # Include all features, not just first 5
-        if feature in X.columns:
-            feature_values = X[feature]
-            # Ensure we convert to list properly
-            anomaly_preview[feature] = [float(val) if pd.notna(val) and val is not None else 0.0 for val in feature_values]
+    # Add original feature values for preview (all features, missing values as 0.0)
+    feature_values = np.where(np.isnan(X_values), 0.0, X_values)
+    preview_columns.update(zip(features, feature_values.T))
     
-    metrics['anomaly_preview'] = anomaly_preview.to_dict(orient='records')
+    # Column-oriented payload: one list per row instead of one dict per row
+    columns = list(preview_columns)
+    metrics['anomaly_preview'] = {
+        'columns': columns,
+        'data': [list(row) for row in zip(*(values.tolist() for values in preview_columns.values()))]
+    }
     
     # Analyze anomalies by feature ranges
-    if n_anomalies_detected > 0:
-        anomaly_mask = anomaly_labels == -1
-        normal_mask = anomaly_labels == 1
+    if n_anomalies_detected > 0 and n_anomalies_detected < len(X):
+        # One grouped pass per statistic instead of masking every feature twice
+        grouped = X.groupby(anomaly_labels, sort=False)
+        group_means = grouped.mean()
+        group_stds = grouped.std(ddof=0)
+        anomaly_means = group_means.loc[-1]
+        normal_means = group_means.loc[1]
+        mean_differences = anomaly_means - normal_means
         
-        feature_analysis = {}
-        for feature in features:
-            if np.sum(anomaly_mask) > 0 and np.sum(normal_mask) > 0 and feature in X.columns:
-                try:
-                    anomaly_values = X[feature][anomaly_mask]
-                    normal_values = X[feature][normal_mask]
-                    
-                    # Convert to numpy arrays to avoid Series issues
-                    anomaly_array = anomaly_values.values if hasattr(anomaly_values, 'values') else anomaly_values
-                    normal_array = normal_values.values if hasattr(normal_values, 'values') else normal_values
-                    
-                    feature_analysis[feature] = {
-                        'anomaly_mean': float(np.mean(anomaly_array)),
-                        'normal_mean': float(np.mean(normal_array)),
-                        'anomaly_std': float(np.std(anomaly_array)),
-                        'normal_std': float(np.std(normal_array)),
-                        'difference_in_means': float(np.mean(anomaly_array) - np.mean(normal_array))
-                    }
-                except Exception as e:
-                    # Skip this feature if there's an issue
-                    continue
+        feature_analysis = {
+            feature: {
+                'anomaly_mean': float(anomaly_means[feature]),
+                'normal_mean': float(normal_means[feature]),
+                'anomaly_std': float(group_stds.at[-1, feature]),
+                'normal_std': float(group_stds.at[1, feature]),
+                'difference_in_means': float(mean_differences[feature])
+            }
+            for feature in features
+        }
         
         metrics['feature_analysis'] = feature_analysis
     
     # Model tree information
-    if hasattr(model, 'estimators_'):
-        tree_depths = []
-        for estimator in model.estimators_:
-            if hasattr(estimator, 'tree_'):
-                tree_depths.append(estimator.tree_.max_depth)
-        
-        if tree_depths:
-            metrics['tree_statistics'] = {
-                'avg_tree_depth': float(np.mean(tree_depths)),
-                'max_tree_depth': int(np.max(tree_depths)),
-                'min_tree_depth': int(np.min(tree_depths))
-            }
+    if hasattr(model, 'estimators_') and len(model.estimators_) > 0:
+        tree_depths = np.fromiter(
+            (estimator.tree_.max_depth for estimator in model.estimators_),
+            dtype=np.int32,
+            count=len(model.estimators_)
+        )
+        metrics['tree_statistics'] = {
+            'avg_tree_depth': float(tree_depths.mean()),
+            'max_tree_depth': int(tree_depths.max()),
+            'min_tree_depth': int(tree_depths.min())
+        }
     
     # Add performance summary
     metrics['performance_summary'] = get_model_performance_summary(metrics, 'anomaly_detection')
@@ -217,6 +222,23 @@ def train_model(dataframe, features, hyperparams=None):
     
     return model, metrics
 
+def sorted_percentile(sorted_values, q):
+    """
+    Percentile of an already sorted array, matching np.percentile's linear interpolation
+    
+    Args:
+        sorted_values: 1-D array sorted in ascending order
+        q: Percentile or array of percentiles in [0, 100]
+    
+    Returns:
+        Percentile value(s)
+    """
+    position = np.asarray(q, dtype=np.float64) / 100 * (len(sorted_values) - 1)
+    lower = np.floor(position).astype(np.intp)
+    upper = np.minimum(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
 def estimate_feature_importance(model, X, features):
     """
     Estimate feature importance by measuring impact on anomaly scores
@@ -230,38 +252,46 @@ def estimate_feature_importance(model, X, features):
         Dictionary of feature importances
     """
     try:
-        # Convert to numpy array if it's a DataFrame
-        X_array = X.values if hasattr(X, 'values') else X
+        # Convert once to the C-contiguous float32 layout the trees score on
+        X_array = np.ascontiguousarray(X, dtype=np.float32)
         baseline_scores = model.decision_function(X_array)
-        feature_importance = {}
+        n_samples = X_array.shape[0]
+        importance = np.empty(len(features), dtype=np.float64)
         
-        for i, feature in enumerate(features):
-            try:
-                # Create a copy of X with this feature permuted
-                X_permuted = X_array.copy()
-                np.random.shuffle(X_permuted[:, i])
-                
-                # Calculate new scores
-                permuted_scores = model.decision_function(X_permuted)
-                
-                # Importance is the change in mean absolute score
-                importance = np.mean(np.abs(baseline_scores - permuted_scores))
-                feature_importance[feature] = float(importance)
-            except Exception as e:
-                # Skip this feature if there's an issue
-                feature_importance[feature] = 0.0
-                continue
+        # Score several permuted copies of X per decision_function call, bounded by memory
+        features_per_batch = max(1, min(len(features), PERMUTATION_BATCH_BYTES // max(1, X_array.nbytes)))
+        # One scratch buffer is reused for every batch; permuted columns are restored after scoring
+        X_scratch = np.tile(X_array, (features_per_batch, 1))
+        for batch_start in range(0, len(features), features_per_batch):
+            batch_features = features[batch_start:batch_start + features_per_batch]
+            
+            # Block j has only column (batch_start + j) permuted
+            for j in range(len(batch_features)):
+                col = batch_start + j
+                rows = slice(j * n_samples, (j + 1) * n_samples)
+                X_scratch[rows, col] = X_array[np.random.permutation(n_samples), col]
+            
+            permuted_scores = model.decision_function(
+                X_scratch[:len(batch_features) * n_samples]
+            ).reshape(len(batch_features), n_samples)
+            
+            for j in range(len(batch_features)):
+                col = batch_start + j
+                X_scratch[j * n_samples:(j + 1) * n_samples, col] = X_array[:, col]
+            
+            # Importance is the change in mean absolute score
+            importance[batch_start:batch_start + len(batch_features)] = np.mean(
+                np.abs(permuted_scores - baseline_scores), axis=1
+            )
         
         # Normalize importance scores
-        total_importance = sum(feature_importance.values())
+        total_importance = importance.sum()
         if total_importance > 0:
-            feature_importance = {
-                k: v / total_importance 
-                for k, v in feature_importance.items()
-            }
+            importance /= total_importance
         
-        # Sort by importance
-        return dict(sorted(feature_importance.items(), key=lambda x: x[1], reverse=True))
+        # Sort by importance (stable, so ties keep the feature order)
+        order = np.argsort(-importance, kind='mergesort')
+        return {features[i]: float(importance[i]) for i in order}
         
     except Exception as e:
         print(f"Warning: Could not calculate feature importance: {e}")
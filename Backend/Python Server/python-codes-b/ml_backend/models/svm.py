@@ -1,10 +1,21 @@
-from sklearn.svm import SVC, SVR
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
+import os
+from functools import lru_cache
 import numpy as np
 import pandas as pd
+from scipy.sparse import issparse
 from utils.metrics import calculate_classification_metrics, calculate_regression_metrics, get_model_performance_summary
 from utils.preprocessing import preprocess_data, detect_problem_type
+from utils.jit import normalize_and_argsort, FEATURE_IMPORTANCE_TOP_K
+
+# Iteration cap for LinearSVC/LinearSVR when max_iter is left at libsvm's unlimited -1
+LIBLINEAR_MAX_ITER = 1000
+# Above this many training samples a kernel SVC is bagged across all cores (libsvm is single-threaded)
+SVC_BAGGING_MIN_SAMPLES = 5000
+# Each bagged SVC trains on at least this many samples, whatever the host's core count
+SVC_BAGGING_MIN_SAMPLES_PER_ESTIMATOR = 2500
+# Parameters only one of SVC/SVR accepts (SVR doesn't support random_state)
+SVR_ONLY_PARAMS = frozenset({'epsilon'})
+SVC_ONLY_PARAMS = frozenset({'probability', 'random_state'})
 
 # Helper function to safely convert NumPy types to Python native types
 def safe_convert(obj):
@@ -23,7 +34,20 @@ def safe_convert(obj):
     else:
         return obj
 
-def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, task_type=None, model_variant=None):
+def convert_if_needed(metrics):
+    """
+    Run safe_convert only when a top-level metric still holds NumPy values
+    
+    The metric calculators in utils.metrics already emit native Python types,
+    and app.py converts the full response again before serializing, so the
+    common case is a shallow scan instead of a full recursive rebuild.
+    """
+    if any(isinstance(v, (np.generic, np.ndarray)) for v in metrics.values()):
+        return safe_convert(metrics)
+    return metrics
+
+def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, task_type=None, model_variant=None,
+                compute_proba=True):
     """
     Train a Support Vector Machine model with enhanced task type detection
     
@@ -35,10 +59,22 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
         hyperparams: Dictionary of hyperparameters
         task_type: Explicitly specified task type ('classification' or 'regression')
         model_variant: Specific model variant (e.g., 'SVC', 'SVR')
+        compute_proba: Whether to compute class probabilities for ROC AUC (default: True)
     
     Returns:
         Trained model, metrics, X_test, y_test, y_pred
     """
+    # Deferred so workers only pay for the estimator libraries they actually use
+    try:
+        # Intel oneDAL drop-in estimators: threaded, vectorized kernel evaluation
+        from sklearnex.svm import SVC, SVR
+        onedal_svm = True
+    except ImportError:
+        from sklearn.svm import SVC, SVR
+        onedal_svm = False
+    from sklearn.svm import LinearSVC, LinearSVR
+    from sklearn.model_selection import StratifiedShuffleSplit, train_test_split
+    
     if hyperparams is None:
         hyperparams = {}
     
@@ -50,7 +86,7 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
         'degree': 3,
         'coef0': 0.0,
         'shrinking': True,
-        'probability': True,  # For classification
+        'probability': False,  # Platt scaling runs an extra 5-fold CV; only enable when probabilities are needed
         'tol': 1e-3,
         'cache_size': 200,
         'max_iter': -1,
@@ -73,52 +109,80 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
     
     # Ensure all feature columns are numeric (SVM requirement)
     print(f"Feature data types before conversion: {processed_df[features].dtypes}")
-    for feature in features:
-        processed_df[feature] = pd.to_numeric(processed_df[feature], errors='coerce')
-    
-    # Fill any NaN values that might have been created during conversion
-    processed_df[features] = processed_df[features].fillna(0)
+    # Coerce every feature column in one pass and fill any NaN values created by the conversion
+    processed_df[features] = processed_df[features].apply(pd.to_numeric, errors='coerce').fillna(0)
     print(f"Feature data types after conversion: {processed_df[features].dtypes}")
     
     # Prepare features and target
     X = processed_df[features]
     y = processed_df[target]
     
-    # Detect problem type
-    problem_type = detect_problem_type(y)
+    # Detect problem type; the unique classes and counts are reused below
+    problem_type, unique_y, counts_y = detect_problem_type(y, return_counts=True)
+    
+    # Hand the estimators one C-contiguous matrix so fit/predict do not re-copy the DataFrame.
+    # oneDAL computes kernels in float32; libsvm and liblinear only accept float64.
+    feature_dtype = np.float32 if onedal_svm and default_params.get('kernel') != 'linear' else np.float64
+    X = np.ascontiguousarray(X.to_numpy(dtype=feature_dtype))
+    y = y.to_numpy()
+    
+    # A linear kernel is solved by liblinear (coordinate descent) instead of libsvm's kernelized SMO
+    use_liblinear = default_params.get('kernel') == 'linear'
+    if use_liblinear:
+        linear_params = {
+            'C': default_params['C'],
+            'tol': default_params['tol'],
+            # liblinear needs a finite iteration cap; -1 means "no limit" for libsvm
+            'max_iter': default_params['max_iter'] if default_params['max_iter'] > 0 else LIBLINEAR_MAX_ITER,
+            'dual': 'auto',
+            'random_state': default_params['random_state']
+        }
     
     # Choose appropriate model and remove incompatible parameters
     if problem_type == 'classification':
         # Remove SVR-specific parameters
-        svm_params = {k: v for k, v in default_params.items() 
-                     if k not in ['epsilon']}
-        model = SVC(**svm_params)
+        svm_params = default_params.copy()
+        for key in SVR_ONLY_PARAMS:
+            svm_params.pop(key, None)
+        if use_liblinear:
+            model = LinearSVC(**linear_params)
+        else:
+            model = SVC(**svm_params)
         
         # Check if stratification is possible (each class needs at least 2 samples)
-        class_counts = y.value_counts()
-        min_class_count = class_counts.min()
-        
-        if min_class_count >= 2:
+        if counts_y.min() >= 2:
             stratify = y
             print(f"INFO: Using stratified splitting for SVC")
         else:
             stratify = None
             print(f"⚠️ Using random splitting for SVC (some classes have <2 samples)")
-            print(f"   Class distribution: {dict(class_counts)}")
+            print(f"   Class distribution: {dict(zip(unique_y.tolist(), counts_y.tolist()))}")
     else:
         # Remove SVC-specific parameters and add SVR-specific ones
-        svm_params = {k: v for k, v in default_params.items() 
-                     if k not in ['probability', 'random_state']}  # SVR doesn't support random_state
+        svm_params = default_params.copy()
+        for key in SVC_ONLY_PARAMS:
+            svm_params.pop(key, None)
         svm_params['epsilon'] = hyperparams.get('epsilon', 0.1)
-        print(f"INFO: Using SVR with parameters: {svm_params}")
-        model = SVR(**svm_params)
+        if use_liblinear:
+            print(f"INFO: Using LinearSVR with parameters: {linear_params}")
+            model = LinearSVR(epsilon=svm_params['epsilon'], **linear_params)
+        else:
+            print(f"INFO: Using SVR with parameters: {svm_params}")
+            model = SVR(**svm_params)
         stratify = None
     
     # Split the data with proper stratification handling
     try:
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42, stratify=stratify
-        )
+        if stratify is not None:
+            # One stratified split yields index arrays directly; same indices as train_test_split(stratify=y)
+            splitter = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=42)
+            (train_idx, test_idx), = splitter.split(X, stratify)
+            X_train, X_test = X[train_idx], X[test_idx]
+            y_train, y_test = y[train_idx], y[test_idx]
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=42
+            )
     except ValueError as e:
         # Fallback to non-stratified split if stratification fails
         print(f"⚠️ Stratified split failed: {str(e)}")
@@ -127,6 +191,36 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
             X, y, test_size=test_size, random_state=42, stratify=None
         )
     
+    # Large libsvm kernel SVCs: up to one SVC per core, trained in parallel. Each draws its own
+    # random 1/n_estimators of the rows without replacement, so the subsets overlap and some
+    # rows go unused; each sub-problem is about n_estimators^2 times cheaper than the full
+    # O(n^2) one. oneDAL's SVC is already multi-threaded, so it is never bagged.
+    n_cores = os.cpu_count() or 1
+    n_estimators = min(n_cores, len(X_train) // SVC_BAGGING_MIN_SAMPLES_PER_ESTIMATOR)
+    if (problem_type == 'classification' and not use_liblinear and not onedal_svm
+            and n_estimators > 1 and len(X_train) > SVC_BAGGING_MIN_SAMPLES):
+        from sklearn.ensemble import BaggingClassifier
+        model = BaggingClassifier(
+            estimator=model,
+            n_estimators=n_estimators,
+            max_samples=1.0 / n_estimators,
+            bootstrap=False,
+            n_jobs=-1,
+            random_state=42
+        )
+    
+    # LinearSVC has no predict_proba; calibrate it when probabilities were requested
+    # and every class has enough training samples for 3 folds
+    if use_liblinear and problem_type == 'classification' and default_params.get('probability'):
+        # Targets are label-encoded to 0..k-1, so one bincount gives every class's training count
+        if np.issubdtype(y_train.dtype, np.integer):
+            train_class_counts = np.bincount(y_train, minlength=unique_y.size)
+        else:
+            train_class_counts = np.unique(y_train, return_counts=True)[1]
+        if train_class_counts.min() >= 3:
+            from sklearn.calibration import CalibratedClassifierCV
+            model = CalibratedClassifierCV(model, cv=3)
+    
     # Train the model with safe parameter handling
     print(f"INFO: Training SVM model of type: {type(model).__name__}")
     
@@ -145,28 +239,38 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
         print(f"❌ Prediction failed: {str(e)}")
         raise ValueError(f"SVM prediction error: {str(e)}")
     
+    # Materialize the class labels once; reused for the metrics and the support vector counts
+    classes_list = None
+    if problem_type == 'classification' and hasattr(model, 'classes_'):
+        classes_list = model.classes_.tolist()
+    
     # Calculate metrics based on problem type with error handling
     try:
         if problem_type == 'classification':
             y_proba = None
-            if hasattr(model, 'predict_proba'):
+            # Probabilities are only consumed for binary ROC AUC
+            if compute_proba and len(classes_list) == 2:
                 try:
-                    y_proba = model.predict_proba(X_test)
+                    if default_params.get('probability') and hasattr(model, 'predict_proba'):
+                        y_proba = model.predict_proba(X_test)
+                    elif hasattr(model, 'decision_function'):
+                        # Without calibration the margin ranks samples the same way for ROC AUC
+                        y_proba = model.decision_function(X_test)
                 except Exception as e:
                     print(f"⚠️ Could not get prediction probabilities: {str(e)}")
                     
             metrics = calculate_classification_metrics(y_test, y_pred, y_proba)
-            metrics['num_classes'] = int(len(np.unique(y)))  # Convert to Python int
+            metrics['num_classes'] = int(unique_y.size)  # Convert to Python int
             
-            if hasattr(model, 'classes_'):
-                metrics['classes'] = model.classes_.tolist()  # Convert ndarray to list
+            if classes_list is not None:
+                metrics['classes'] = classes_list
             else:
-                metrics['classes'] = np.unique(y).tolist()
+                metrics['classes'] = unique_y.tolist()
         else:
             metrics = calculate_regression_metrics(y_test, y_pred)
             
         # Convert any NumPy types in metrics to Python native types
-        metrics = safe_convert(metrics)
+        metrics = convert_if_needed(metrics)
     except Exception as e:
         print(f"❌ Metrics calculation failed: {str(e)}")
         # Provide default metrics
@@ -189,27 +293,52 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
         metrics['support_vector_ratio'] = len(model.support_) / len(X_train)
         
         if problem_type == 'classification':
-            metrics['support_vectors_per_class'] = {
-                str(cls): int(count) for cls, count in 
-                zip(model.classes_, model.n_support_)
-            }
+            # One vectorized cast per array instead of str()/int() per class
+            metrics['support_vectors_per_class'] = dict(zip(
+                model.classes_.astype(str).tolist(),
+                model.n_support_.astype(np.int64).tolist()
+            ))
+    elif hasattr(model, 'estimators_') and all(hasattr(estimator, 'support_') for estimator in model.estimators_):
+        # Bagged SVC: add up the support vectors of the sub-models
+        num_support_vectors = sum(len(estimator.support_) for estimator in model.estimators_)
+        metrics['num_support_vectors'] = num_support_vectors
+        metrics['support_vector_ratio'] = num_support_vectors / len(X_train)
+        
+        # Sub-models are fitted on class indices into model.classes_
+        support_per_class = np.zeros(len(model.classes_), dtype=np.int64)
+        for estimator in model.estimators_:
+            np.add.at(support_per_class, estimator.classes_.astype(np.intp), estimator.n_support_)
+        metrics['support_vectors_per_class'] = dict(zip(
+            model.classes_.astype(str).tolist(),
+            support_per_class.tolist()
+        ))
     
     # Feature importance for linear kernel
-    if default_params.get('kernel') == 'linear' and hasattr(model, 'coef_'):
-        if problem_type == 'classification':
-            if len(model.classes_) == 2:
-                coefficients = model.coef_[0]
-            else:
-                coefficients = np.mean(np.abs(model.coef_), axis=0)
+    coef = None
+    if hasattr(model, 'calibrated_classifiers_'):
+        # Average the coefficients of the per-fold LinearSVC models
+        coef = np.mean([calibrated.estimator.coef_ for calibrated in model.calibrated_classifiers_], axis=0)
+    elif hasattr(model, 'coef_'):
+        coef = model.coef_
+    if default_params.get('kernel') == 'linear' and coef is not None:
+        # coef_ is a scipy sparse matrix when the model was fit on sparse input
+        if issparse(coef):
+            coefficients = np.asarray(abs(coef).mean(axis=0)).ravel()
+        elif coef.ndim == 1:
+            # LinearSVR exposes a flat coefficient vector
+            coefficients = np.abs(coef)
+        elif coef.shape[0] == 1:
+            # Binary classification and SVR expose a single coefficient row
+            coefficients = np.abs(coef[0])
         else:
-            coefficients = model.coef_
+            # LinearSVC is one-vs-rest: average |coef| over its one row per class in a single reduction
+            coefficients = np.abs(coef).mean(axis=0)
         
-        feature_importance = dict(zip(features, np.abs(coefficients)))
-        total_importance = sum(feature_importance.values())
-        if total_importance > 0:
-            feature_importance = {k: v/total_importance for k, v in feature_importance.items()}
-            metrics['feature_importance'] = dict(sorted(feature_importance.items(), 
-                                                       key=lambda x: x[1], reverse=True))
+        order, importance = normalize_and_argsort(
+            np.asarray(coefficients, dtype=np.float64).copy(), FEATURE_IMPORTANCE_TOP_K
+        )
+        if importance.sum() > 0:
+            metrics['feature_importance'] = {features[i]: float(importance[i]) for i in order}
     
     # Add kernel information
     metrics['kernel_used'] = default_params.get('kernel', 'rbf')
@@ -226,10 +355,13 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
     
     return model, metrics, X_test, y_test, y_pred
 
+@lru_cache(maxsize=1)
 def get_model_info():
     """
     Get information about this model
     
+    Built once and cached; callers share the same dictionary and must not mutate it.
+    
     Returns:
         Dictionary with model information
     """
@@ -1,9 +1,34 @@
-import xgboost as xgb
-from sklearn.model_selection import train_test_split
+import json
+import os
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 from utils.metrics import calculate_classification_metrics, calculate_regression_metrics, get_model_performance_summary
 from utils.preprocessing import preprocess_data, detect_problem_type
+from utils.jit import normalize_and_argsort, FEATURE_IMPORTANCE_TOP_K
+
+# Default hyperparameters (never mutated; train_model merges overrides into a new dict)
+DEFAULT_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 6,
+    'learning_rate': 0.1,
+    'subsample': 1.0,
+    'colsample_bytree': 1.0,
+    'reg_alpha': 0,
+    'reg_lambda': 1,
+    'random_state': 42,
+    'n_jobs': -1,
+    'verbosity': 0,
+    # Histogram boosting; the sklearn wrapper bins the data once into a QuantileDMatrix
+    'tree_method': 'hist',
+    'max_bin': 256,
+    'early_stopping_rounds': 20
+}
+
+# Early stopping watches a validation slice of the training split; the test split stays unseen until scoring
+VALIDATION_SIZE = 0.15
+# Below this many training rows no validation slice is held out and early stopping is turned off
+EARLY_STOPPING_MIN_TRAIN_SAMPLES = 100
 
 # Helper function to safely convert NumPy types to Python native types
 def safe_convert(obj):
@@ -22,7 +47,20 @@ def safe_convert(obj):
     else:
         return obj
 
-def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, task_type=None, model_variant=None):
+def convert_if_needed(metrics):
+    """
+    Run safe_convert only when a top-level metric still holds NumPy values
+    
+    The metric calculators in utils.metrics already emit native Python types,
+    and app.py converts the full response again before serializing, so the
+    common case is a shallow scan instead of a full recursive rebuild.
+    """
+    if any(isinstance(v, (np.generic, np.ndarray)) for v in metrics.values()):
+        return safe_convert(metrics)
+    return metrics
+
+def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, task_type=None, model_variant=None,
+                tree_stats=False, compute_proba=True):
     """
     Train an XGBoost model with enhanced task type detection
     
@@ -34,29 +72,28 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
         hyperparams: Dictionary of hyperparameters
         task_type: Explicitly specified task type ('classification' or 'regression')
         model_variant: Specific model variant (e.g., 'XGBClassifier', 'XGBRegressor')
+        tree_stats: Whether to add node/depth statistics of the trained trees (default: False)
+        compute_proba: Whether to compute class probabilities for ROC AUC (default: True)
     
     Returns:
         Trained model, metrics, X_test, y_test, y_pred
     """
-    if hyperparams is None:
-        hyperparams = {}
-    
-    # Set default hyperparameters
-    default_params = {
-        'n_estimators': 100,
-        'max_depth': 6,
-        'learning_rate': 0.1,
-        'subsample': 1.0,
-        'colsample_bytree': 1.0,
-        'reg_alpha': 0,
-        'reg_lambda': 1,
-        'random_state': 42,
-        'n_jobs': -1,
-        'verbosity': 0
-    }
+    # Deferred so workers only pay for the estimator libraries they actually use
+    import xgboost as xgb
+    from sklearn.model_selection import StratifiedShuffleSplit, train_test_split
     
-    # Update with provided hyperparameters
-    default_params.update(hyperparams)
+    # Merge provided hyperparameters over the defaults in a single pass
+    default_params = {**DEFAULT_PARAMS, **(hyperparams or {})}
+    
+    # Optional GPU histogram training: XGB_DEVICE=cuda or hyperparams {'device': 'cuda'}
+    use_cuda = default_params.pop('device', os.getenv('XGB_DEVICE', 'cpu')) == 'cuda'
+    # Node/depth statistics can also be requested per run via hyperparams {'include_tree_stats': True}
+    tree_stats = bool(default_params.pop('include_tree_stats', tree_stats))
+    # Evaluating the training set every round is diagnostic only; opt in via {'record_train_history': True}
+    record_train_history = bool(default_params.pop('record_train_history', False))
+    if use_cuda:
+        default_params.update(device_params(xgb, 'cuda'))
+        print(f"INFO: Training XGBoost on the GPU with {device_params(xgb, 'cuda')}")
     
     # Preprocess data
     processed_df, feature_encoders, target_encoder = preprocess_data(
@@ -71,17 +108,20 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
     
     # Ensure all feature columns are numeric (XGBoost requirement)
     print(f"Feature data types before conversion: {processed_df[features].dtypes}")
-    for feature in features:
-        processed_df[feature] = pd.to_numeric(processed_df[feature], errors='coerce')
-    
-    # Fill any NaN values that might have been created during conversion
-    processed_df[features] = processed_df[features].fillna(0)
-    print(f"Feature data types after conversion: {processed_df[features].dtypes}")
+    # Coerce every feature column in one pass, fill any NaN values created by the conversion and
+    # cast straight to float32 (what XGBoost bins), without writing a float64 copy back into processed_df.
+    # X stays a DataFrame so the booster keeps the feature names the predict endpoint sends.
+    X = processed_df[features].apply(pd.to_numeric, errors='coerce').fillna(0).astype(np.float32)
+    print(f"Feature data types after conversion: {X.dtypes}")
     
-    # Prepare features and target
-    X = processed_df[features]
+    # Prepare target
     y = processed_df[target]
     
+    # Unique classes and counts are computed once and reused for the objective, stratification and metrics
+    unique_y = counts_y = None
+    if not task_type or task_type == 'classification':
+        detected_type, unique_y, counts_y = detect_problem_type(y, return_counts=True)
+    
     # Enhanced: Use provided task type or auto-detect
     if task_type:
         problem_type = task_type
@@ -90,17 +130,21 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
             print(f"DEBUG: Using model variant: {model_variant}")
     else:
         # Fallback to auto-detection
-        problem_type = detect_problem_type(y)
+        problem_type = detected_type
         print(f"DEBUG: Auto-detected problem type: {problem_type}")
     
+    # Integer class labels fit in int32; halves the label buffer handed to XGBoost
+    if problem_type == 'classification' and pd.api.types.is_integer_dtype(y):
+        y = y.astype(np.int32)
+    
     # Choose appropriate model and objective based on task type
-    # Remove any parameters that might cause issues
-    clean_params = default_params.copy()
-    clean_params.pop('early_stopping_rounds', None)
+    # early_stopping_rounds is a constructor argument (not a fit argument) from XGBoost 1.6 on
+    clean_params = dict(default_params)
     
+    num_classes = None
     try:
         if problem_type == 'classification':
-            num_classes = len(np.unique(y))
+            num_classes = int(unique_y.size)
             if num_classes == 2:
                 clean_params['objective'] = 'binary:logistic'
                 clean_params['eval_metric'] = 'logloss'
@@ -124,16 +168,13 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
                 print("INFO: Created XGBClassifier with minimal parameters")
             
             # Check if stratification is possible (each class needs at least 2 samples)
-            class_counts = y.value_counts()
-            min_class_count = class_counts.min()
-            
-            if min_class_count >= 2:
+            if counts_y.min() >= 2:
                 stratify = y
                 print(f"INFO: Selected XGBClassifier with stratified splitting")
             else:
                 stratify = None
                 print(f"WARN: Selected XGBClassifier with random splitting (some classes have <2 samples)")
-                print(f"   Class distribution: {dict(class_counts)}")
+                print(f"   Class distribution: {dict(zip(unique_y.tolist(), counts_y.tolist()))}")
         else:
             clean_params['objective'] = 'reg:squarederror'
             clean_params['eval_metric'] = 'rmse'
@@ -160,9 +201,16 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
     
     # Split the data with proper stratification handling
     try:
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42, stratify=stratify
-        )
+        if stratify is not None:
+            # One stratified split yields index arrays directly; same indices as train_test_split(stratify=y)
+            splitter = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=42)
+            (train_idx, test_idx), = splitter.split(X, stratify)
+            X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+            y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=test_size, random_state=42
+            )
     except ValueError as e:
         # Fallback to non-stratified split if stratification fails
         print(f"⚠️ Stratified split failed: {str(e)}")
@@ -171,33 +219,75 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
             X, y, test_size=test_size, random_state=42, stratify=None
         )
     
-    # Train the model with proper parameter handling based on XGBoost version (3.0.0)
-    # In XGBoost 3.0.0, API has changed and early_stopping_rounds now belongs in fit_params
-    print(f"INFO: Training XGBoost model of type: {type(model).__name__}")
+    # Early stopping picks the boosting round on a validation slice of the training split,
+    # so X_test is not seen until the metrics below
+    validation_split = None
+    if model.get_params().get('early_stopping_rounds'):
+        validation_split = split_validation_set(X_train, y_train, stratify is not None)
+        if validation_split is None:
+            print(f"INFO: Fewer than {EARLY_STOPPING_MIN_TRAIN_SAMPLES} training rows, training without early stopping")
+            model.set_params(early_stopping_rounds=None)
+            default_params['early_stopping_rounds'] = None
+    
+    if validation_split is not None:
+        X_fit, X_val, y_fit, y_val = validation_split
+        eval_set = [(X_val, y_val)]
+    else:
+        X_fit, y_fit = X_train, y_train
+        X_val = None
+        eval_set = []
+    if record_train_history:
+        eval_set.insert(0, (X_fit, y_fit))
+    # The eval sets are binned against the training QuantileDMatrix; early stopping watches the last one
+    eval_set = eval_set or None
     
-    # For XGBoost 3.0.0+, we need different parameter handling
-    # First, try minimal approach - just train without eval or early stopping
+    # Train the model
+    print(f"INFO: Training XGBoost model of type: {type(model).__name__}")
     try:
-        print("INFO: Training with basic parameters only")
-        # Convert all data to float to avoid categorical data errors
-        X_train_float = X_train.astype(float)
-        X_test_float = X_test.astype(float)
-        model.fit(X_train_float, y_train)
+        print(f"INFO: Training with histogram boosting{' and early stopping' if X_val is not None else ''}")
+        try:
+            model.fit(X_fit, y_fit, eval_set=eval_set, verbose=False)
+        except xgb.core.XGBoostError as e:
+            if not use_cuda:
+                raise
+            # No usable CUDA device or build: train on the CPU instead
+            print(f"⚠️ GPU training failed, falling back to CPU: {str(e)}")
+            use_cuda = False
+            default_params.update(device_params(xgb, 'cpu'))
+            model.set_params(**device_params(xgb, 'cpu'))
+            model.fit(X_fit, y_fit, eval_set=eval_set, verbose=False)
     except Exception as e:
         print(f"⚠️ Initial XGBoost training failed: {str(e)}")
         try:
             print("INFO: Trying with enable_categorical=True")
             if hasattr(model, 'set_params'):
                 model.set_params(enable_categorical=True)
-            model.fit(X_train, y_train)
+            model.fit(X_fit, y_fit, eval_set=eval_set, verbose=False)
         except Exception as e2:
             print(f"❌ XGBoost training failed completely: {str(e2)}")
             raise ValueError(f"XGBoost training error: {str(e2)}")
         
+    if use_cuda:
+        # Predictions here and in the predict endpoint run on host DataFrames
+        model.set_params(**device_params(xgb, 'cpu'))
+    
+    # Probabilities are only consumed by the metrics layer for binary ROC AUC
+    need_proba = compute_proba and problem_type == 'classification' and num_classes == 2
+    y_proba = None
+    
     # Make predictions with error handling
     try:
-        # Make prediction using the float-converted test data
-        y_pred = model.predict(X_test_float)
+        if need_proba:
+            try:
+                y_proba = model.predict_proba(X_test)
+            except Exception as e:
+                print(f"⚠️ Could not get prediction probabilities: {str(e)}")
+        
+        if y_proba is not None:
+            # Derive labels from the probabilities instead of traversing the forest again
+            y_pred = model.classes_[np.argmax(y_proba, axis=1)]
+        else:
+            y_pred = model.predict(X_test)
         print("INFO: Prediction successful")
     except Exception as e:
         print(f"❌ Initial prediction failed: {str(e)}")
@@ -213,25 +303,18 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
     # Calculate metrics based on problem type with error handling
     try:
         if problem_type == 'classification':
-            # Try to get prediction probabilities
-            try:
-                y_proba = model.predict_proba(X_test)
-            except Exception as e:
-                print(f"⚠️ Could not get prediction probabilities: {str(e)}")
-                y_proba = None
-                
             metrics = calculate_classification_metrics(y_test, y_pred, y_proba)
-            metrics['num_classes'] = int(len(np.unique(y)))  # Convert to Python int
+            metrics['num_classes'] = num_classes
             
             if hasattr(model, 'classes_'):
                 metrics['classes'] = model.classes_.tolist()  # Convert ndarray to list
             else:
-                metrics['classes'] = np.unique(y).tolist()  # Convert ndarray to list
+                metrics['classes'] = unique_y.tolist()  # Convert ndarray to list
         else:
             metrics = calculate_regression_metrics(y_test, y_pred)
             
         # Convert any NumPy types in metrics to Python native types
-        metrics = safe_convert(metrics)
+        metrics = convert_if_needed(metrics)
     except Exception as e:
         print(f"❌ Metrics calculation failed: {str(e)}")
         # Provide default metrics
@@ -250,15 +333,21 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
     metrics['model_class'] = type(model).__name__
     metrics['hyperparameters'] = default_params
     metrics['feature_count'] = len(features)
-    metrics['training_samples'] = len(X_train)
+    metrics['training_samples'] = len(X_fit)
+    metrics['validation_samples'] = len(X_val) if X_val is not None else 0
     metrics['test_samples'] = len(X_test)
     
     # Add XGBoost-specific metrics with error handling
     try:
         n_estimators = getattr(model, 'n_estimators', 100)
-        best_iteration = getattr(model, 'best_iteration_', n_estimators)
-        metrics['best_iteration'] = best_iteration
-        metrics['n_estimators_used'] = best_iteration
+        # best_iteration is only set (0-based) when early stopping ran
+        best_iteration = getattr(model, 'best_iteration', None)
+        if best_iteration is None:
+            metrics['best_iteration'] = n_estimators
+            metrics['n_estimators_used'] = n_estimators
+        else:
+            metrics['best_iteration'] = int(best_iteration)
+            metrics['n_estimators_used'] = int(best_iteration) + 1
     except Exception as e:
         print(f"⚠️ Could not get best_iteration: {str(e)}")
         metrics['best_iteration'] = 100
@@ -267,9 +356,10 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
     # Add feature importance with error handling
     try:
         if hasattr(model, 'feature_importances_'):
-            feature_importance = dict(zip(features, model.feature_importances_))
-            metrics['feature_importance'] = dict(sorted(feature_importance.items(), 
-                                                   key=lambda x: x[1], reverse=True))
+            order, importance = normalize_and_argsort(
+                np.asarray(model.feature_importances_, dtype=np.float64).copy(), FEATURE_IMPORTANCE_TOP_K
+            )
+            metrics['feature_importance'] = {features[i]: float(importance[i]) for i in order}
     except Exception as e:
         print(f"⚠️ Could not get feature importance: {str(e)}")
         metrics['feature_importance'] = {}
@@ -281,32 +371,27 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
             metrics['training_history'] = {}
             
             for eval_name, eval_metrics in evals_result.items():
+                # Last 10 values as float32 arrays; the JSON encoders in app.py serialize ndarrays
                 metrics['training_history'][eval_name] = {
-                    metric_name: metric_values[-10:]  # Last 10 values to reduce size
+                    metric_name: np.asarray(metric_values[-10:], dtype=np.float32)
                     for metric_name, metric_values in eval_metrics.items()
                 }
     except Exception as e:
         print(f"⚠️ Could not get evaluation history: {str(e)}")
         metrics['training_history'] = {}
     
-    # Add tree information with error handling
+    # Add tree information with error handling (full statistics are opt-in: they walk every node of every tree)
     try:
-        if hasattr(model, 'get_booster'):
-            booster = model.get_booster()
-            try:
-                tree_info = booster.trees_to_dataframe()
-                if not tree_info.empty:
-                    metrics['tree_statistics'] = {
-                        'total_nodes': len(tree_info),
-                        'total_trees': tree_info['Tree'].nunique(),
-                        'avg_tree_depth': float(tree_info['Depth'].mean()),
-                        'max_tree_depth': int(tree_info['Depth'].max())
-                    }
-            except Exception as e:
-                print(f"⚠️ Could not get tree info: {str(e)}")
-                metrics['tree_statistics'] = {}
+        if tree_stats:
+            metrics['tree_statistics'] = compute_tree_statistics(model.get_booster())
+        else:
+            # Multi-class boosters grow one tree per class each round
+            trees_per_round = num_classes if num_classes and num_classes > 2 else 1
+            metrics['tree_statistics'] = {
+                'total_trees': model.get_booster().num_boosted_rounds() * trees_per_round
+            }
     except Exception as e:
-        print(f"⚠️ Could not get booster: {str(e)}")
+        print(f"⚠️ Could not get tree info: {str(e)}")
         metrics['tree_statistics'] = {}
     
     # Add performance summary
@@ -321,10 +406,91 @@ def train_model(dataframe, features, target, test_size=0.2, hyperparams=None, ta
     
     return model, metrics, X_test, y_test, y_pred
 
+def split_validation_set(X_train, y_train, stratified):
+    """
+    Hold out a validation slice of the training split for early stopping
+    
+    Args:
+        X_train: Training features
+        y_train: Training target
+        stratified: Whether to keep the class proportions in both parts
+    
+    Returns:
+        Tuple of (X_fit, X_val, y_fit, y_val), or None when the training split is too small
+    """
+    from sklearn.model_selection import StratifiedShuffleSplit, train_test_split
+    
+    if len(X_train) < EARLY_STOPPING_MIN_TRAIN_SAMPLES:
+        return None
+    if stratified and np.unique(y_train, return_counts=True)[1].min() >= 2:
+        try:
+            splitter = StratifiedShuffleSplit(n_splits=1, test_size=VALIDATION_SIZE, random_state=42)
+            (fit_idx, val_idx), = splitter.split(X_train, y_train)
+            return X_train.iloc[fit_idx], X_train.iloc[val_idx], y_train.iloc[fit_idx], y_train.iloc[val_idx]
+        except ValueError as e:
+            # e.g. more classes than validation rows
+            print(f"⚠️ Stratified validation split failed, using a random split: {str(e)}")
+    return tuple(train_test_split(X_train, y_train, test_size=VALIDATION_SIZE, random_state=42))
+
+def device_params(xgb, device):
+    """
+    XGBoost parameters selecting histogram training on the given device
+    
+    XGBoost 2.0 introduced the 'device' parameter; 1.x selects the GPU
+    through tree_method='gpu_hist' instead.
+    
+    Args:
+        xgb: The imported xgboost module
+        device: 'cuda' or 'cpu'
+    
+    Returns:
+        Dictionary of parameters to merge into the model parameters
+    """
+    if int(xgb.__version__.split('.')[0]) >= 2:
+        return {'device': device, 'tree_method': 'hist'}
+    return {'tree_method': 'gpu_hist' if device == 'cuda' else 'hist'}
+
+def compute_tree_statistics(booster):
+    """
+    Summarize tree sizes and depths from the booster's JSON dump
+    
+    Args:
+        booster: Trained xgboost Booster
+    
+    Returns:
+        Dictionary with node count, tree count and per-tree depth statistics
+    """
+    tree_depths = []
+    total_nodes = 0
+    for tree_dump in booster.get_dump(dump_format='json'):
+        stack = [(json.loads(tree_dump), 0)]
+        tree_depth = 0
+        while stack:
+            node, depth = stack.pop()
+            total_nodes += 1
+            tree_depth = max(tree_depth, depth)
+            for child in node.get('children', ()):
+                stack.append((child, depth + 1))
+        tree_depths.append(tree_depth)
+    
+    if not tree_depths:
+        return {}
+    
+    tree_depths = np.asarray(tree_depths)
+    return {
+        'total_nodes': total_nodes,
+        'total_trees': len(tree_depths),
+        'avg_tree_depth': float(tree_depths.mean()),
+        'max_tree_depth': int(tree_depths.max())
+    }
+
+@lru_cache(maxsize=1)
 def get_model_info():
     """
     Get information about this model
     
+    Built once and cached; callers share the same dictionary and must not mutate it.
+    
     Returns:
         Dictionary with model information
     """
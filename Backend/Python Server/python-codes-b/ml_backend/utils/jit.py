@@ -0,0 +1,138 @@
+import numpy as np
+
+# Numba is optional: without it the kernels below run as plain NumPy/Python
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when Numba is not installed"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Feature-importance payloads keep only the strongest features; the frontend shows the top few
+FEATURE_IMPORTANCE_TOP_K = 50
+
+@njit(cache=True)
+def normalize_and_argsort(importance, top_k=0):
+    """
+    Normalize importance scores in place and order them by descending value
+
+    Args:
+        importance: 1-D float64 array of non-negative importance scores
+        top_k: Only order the top_k largest scores (0 orders all of them)
+
+    Returns:
+        Tuple of (indices sorted by descending importance, normalized importance)
+    """
+    total = 0.0
+    for value in importance:
+        total += value
+    if total > 0:
+        for i in range(importance.size):
+            importance[i] /= total
+
+    negated = -importance
+    if 0 < top_k < importance.size:
+        # Partition to the k-th largest score and only sort the candidates at or above it
+        threshold = np.partition(negated, top_k - 1)[top_k - 1]
+        candidates = np.nonzero(negated <= threshold)[0]
+        order = candidates[np.argsort(negated[candidates], kind='mergesort')][:top_k]
+    else:
+        # Stable sort keeps the original feature order for ties
+        order = np.argsort(negated, kind='mergesort')
+    return order, importance
+
+@njit(cache=True)
+def find_knee(sorted_values):
+    """
+    Locate the knee of an ascending curve (Kneedle) in a single pass
+
+    Both axes are scaled to [0, 1] and the knee is the point furthest below
+    the straight line joining the first and last values.
+
+    Args:
+        sorted_values: 1-D array sorted in ascending order
+
+    Returns:
+        Index of the knee point
+    """
+    n_values = sorted_values.size
+    first = sorted_values[0]
+    value_range = sorted_values[n_values - 1] - first
+    if value_range <= 0:
+        return n_values - 1
+
+    x_step = 1.0 / (n_values - 1)
+    best_index = 0
+    best_gap = -np.inf
+    for i in range(n_values):
+        gap = i * x_step - (sorted_values[i] - first) / value_range
+        if gap > best_gap:
+            best_gap = gap
+            best_index = i
+    return best_index
+
+@njit(cache=True)
+def confusion_counts(true_codes, pred_codes, n_classes):
+    """
+    Build a confusion matrix from integer-coded labels in a single pass
+    
+    Args:
+        true_codes: 1-D integer array of true class codes in [0, n_classes)
+        pred_codes: 1-D integer array of predicted class codes in [0, n_classes)
+        n_classes: Number of classes
+    
+    Returns:
+        (n_classes, n_classes) int64 array with true classes as rows
+    """
+    counts = np.zeros((n_classes, n_classes), dtype=np.int64)
+    for i in range(true_codes.size):
+        counts[true_codes[i], pred_codes[i]] += 1
+    return counts
+
+@njit(cache=True)
+def binary_confusion(y_true, y_pred):
+    """
+    Count the 2x2 confusion matrix of +1/-1 anomaly labels in a single pass
+    
+    Args:
+        y_true: 1-D array of true labels (1 for normal, -1 for anomaly)
+        y_pred: 1-D array of predicted labels (1 for normal, -1 for anomaly)
+    
+    Returns:
+        Tuple of (tn, fp, fn, tp) with anomalies as the positive class
+    """
+    tn = fp = fn = tp = 0
+    for i in range(y_true.size):
+        if y_true[i] == -1:
+            if y_pred[i] == -1:
+                tp += 1
+            else:
+                fn += 1
+        elif y_pred[i] == -1:
+            fp += 1
+        else:
+            tn += 1
+    return tn, fp, fn, tp
+
+def warm_up_kernels():
+    """
+    Compile every kernel (or load it from Numba's on-disk cache) ahead of the first request
+    
+    The dummy arguments use the same dtypes the models and metrics pass in, so the
+    specializations built here are the ones requests reuse.
+    """
+    if not NUMBA_AVAILABLE:
+        return
+    normalize_and_argsort(np.ones(2), FEATURE_IMPORTANCE_TOP_K)
+    # DBSCAN's k-distances are float32 from the dense path, float64 from the neighbor index
+    find_knee(np.arange(3, dtype=np.float32))
+    find_knee(np.arange(3, dtype=np.float64))
+    codes = np.zeros(2, dtype=np.intp)
+    confusion_counts(codes, codes, 2)
+    # Isolation Forest compares float64 reference labels with integer predictions
+    binary_confusion(np.ones(2), np.ones(2, dtype=np.int64))
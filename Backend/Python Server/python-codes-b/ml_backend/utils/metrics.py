@@ -1,11 +1,11 @@
+import math
 import numpy as np
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
-    roc_auc_score, confusion_matrix, classification_report,
-    mean_squared_error, mean_absolute_error, r2_score,
-    silhouette_score, adjusted_rand_score, davies_bouldin_score
-)
-import pandas as pd
+# sklearn.metrics is imported inside the functions that need it: it is slow to import
+# and the classification, regression and anomaly paths are computed with NumPy alone
+from utils.jit import binary_confusion, confusion_counts, NUMBA_AVAILABLE
+
+# Silhouette is O(n^2) in time and memory; above this many samples it is estimated on a random subset
+SILHOUETTE_SAMPLE_SIZE = 10000
 
 def calculate_classification_metrics(y_true, y_pred, y_proba=None):
     """
@@ -21,31 +21,102 @@ def calculate_classification_metrics(y_true, y_pred, y_proba=None):
     """
     metrics = {}
     
+    # Factorize both label arrays together (sorted union, as sklearn orders them) and count once
+    y_true = np.asarray(y_true).ravel()
+    n_samples = y_true.size
+    labels, codes = np.unique(
+        np.concatenate([y_true, np.asarray(y_pred).ravel()]), return_inverse=True
+    )
+    codes = codes.ravel()
+    if NUMBA_AVAILABLE:
+        cm = confusion_counts(codes[:n_samples], codes[n_samples:], labels.size)
+    else:
+        cm = np.bincount(
+            codes[:n_samples] * labels.size + codes[n_samples:], minlength=labels.size ** 2
+        ).reshape(labels.size, labels.size)
+    
+    # Per-class scores from the confusion matrix (zero_division=0 semantics)
+    true_positives = np.diag(cm).astype(np.float64)
+    support = cm.sum(axis=1).astype(np.float64)
+    predicted = cm.sum(axis=0).astype(np.float64)
+    class_precision = np.divide(true_positives, predicted, out=np.zeros_like(true_positives), where=predicted > 0)
+    class_recall = np.divide(true_positives, support, out=np.zeros_like(true_positives), where=support > 0)
+    f1_denominator = support + predicted
+    class_f1 = np.divide(2 * true_positives, f1_denominator, out=np.zeros_like(true_positives), where=f1_denominator > 0)
+    weights = support / n_samples
+    
     # Basic metrics
-    metrics['accuracy'] = float(accuracy_score(y_true, y_pred))
-    metrics['precision'] = float(precision_score(y_true, y_pred, average='weighted', zero_division=0))
-    metrics['recall'] = float(recall_score(y_true, y_pred, average='weighted', zero_division=0))
-    metrics['f1_score'] = float(f1_score(y_true, y_pred, average='weighted', zero_division=0))
+    # .item() / .tolist() hand back native Python floats for the JSON payload
+    metrics['accuracy'] = (true_positives.sum() / n_samples).item()
+    metrics['precision'] = np.dot(class_precision, weights).item()
+    metrics['recall'] = np.dot(class_recall, weights).item()
+    metrics['f1_score'] = np.dot(class_f1, weights).item()
     
     # Confusion matrix
-    cm = confusion_matrix(y_true, y_pred)
     metrics['confusion_matrix'] = cm.tolist()
     
-    # ROC AUC for binary classification
-    if len(np.unique(y_true)) == 2 and y_proba is not None:
+    # ROC AUC for binary classification; the positive class is the larger label, as in sklearn
+    present_codes = np.flatnonzero(support)
+    if present_codes.size == 2 and y_proba is not None:
         if y_proba.ndim > 1:
             y_proba = y_proba[:, 1]  # Take positive class probabilities
-        metrics['roc_auc'] = float(roc_auc_score(y_true, y_proba))
+        metrics['roc_auc'] = binary_roc_auc(codes[:n_samples] == present_codes[1], y_proba)
     
-    # Class-wise metrics
+    # Class-wise metrics, in classification_report's output_dict layout
     try:
-        report = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
+        report = {
+            str(label): {
+                'precision': precision,
+                'recall': recall,
+                'f1-score': f1,
+                'support': class_support
+            }
+            for label, precision, recall, f1, class_support in zip(
+                labels.tolist(), class_precision.tolist(), class_recall.tolist(),
+                class_f1.tolist(), support.tolist()
+            )
+        }
+        report['accuracy'] = metrics['accuracy']
+        report['macro avg'] = {
+            'precision': class_precision.mean().item(),
+            'recall': class_recall.mean().item(),
+            'f1-score': class_f1.mean().item(),
+            'support': float(n_samples)
+        }
+        report['weighted avg'] = {
+            'precision': metrics['precision'],
+            'recall': metrics['recall'],
+            'f1-score': metrics['f1_score'],
+            'support': float(n_samples)
+        }
         metrics['class_report'] = report
     except:
         pass
     
     return metrics
 
+def binary_roc_auc(is_positive, scores):
+    """
+    Area under the ROC curve for already-binarized labels
+    
+    Args:
+        is_positive: Boolean array marking the positive samples
+        scores: Scores or probabilities of the positive class
+    
+    Returns:
+        ROC AUC as a float
+    """
+    # Walk the thresholds from the highest score down, one ROC point per distinct score
+    order = np.argsort(scores, kind='mergesort')[::-1]
+    sorted_scores = np.asarray(scores)[order]
+    threshold_ends = np.r_[np.flatnonzero(np.diff(sorted_scores)), sorted_scores.size - 1]
+    true_positives = np.cumsum(is_positive[order])[threshold_ends]
+    false_positives = threshold_ends + 1 - true_positives
+    tpr = np.r_[0, true_positives] / true_positives[-1]
+    fpr = np.r_[0, false_positives] / false_positives[-1]
+    # Trapezoidal area
+    return np.dot(np.diff(fpr), (tpr[1:] + tpr[:-1]) / 2).item()
+
 def calculate_regression_metrics(y_true, y_pred):
     """
     Calculate comprehensive regression metrics
@@ -59,26 +130,50 @@ def calculate_regression_metrics(y_true, y_pred):
     """
     metrics = {}
     
-    # Basic metrics
-    metrics['r2_score'] = float(r2_score(y_true, y_pred))
-    metrics['mean_squared_error'] = float(mean_squared_error(y_true, y_pred))
-    metrics['root_mean_squared_error'] = float(np.sqrt(mean_squared_error(y_true, y_pred)))
-    metrics['mean_absolute_error'] = float(mean_absolute_error(y_true, y_pred))
+    # Cast once; every metric below is derived from one residual array.
+    # float32 inputs stay float32 (half the memory traffic); scalars become Python floats via .item()
+    dtype = np.result_type(np.asarray(y_true).dtype, np.asarray(y_pred).dtype, np.float32)
+    y_true = np.asarray(y_true, dtype=dtype).ravel()
+    y_pred = np.asarray(y_pred, dtype=dtype).ravel()
+    residuals = y_true - y_pred
+    abs_residuals = np.abs(residuals)
+    
+    # Basic metrics (dot products sum the squares without a temporary array)
+    ss_res = np.dot(residuals, residuals).item()
+    centered = y_true - y_true.mean()
+    ss_tot = np.dot(centered, centered).item()
+    mse = ss_res / y_true.size
+    if ss_tot > 0:
+        metrics['r2_score'] = 1.0 - ss_res / ss_tot
+    else:
+        # Constant target: perfect predictions score 1, anything else 0 (as sklearn's r2_score)
+        metrics['r2_score'] = 1.0 if ss_res == 0 else 0.0
+    metrics['mean_squared_error'] = mse
+    metrics['root_mean_squared_error'] = math.sqrt(mse)
+    metrics['mean_absolute_error'] = abs_residuals.mean().item()
     
     # Additional metrics
     try:
-        mape = float(np.mean(np.abs((y_true - y_pred) / (y_true + np.finfo(float).eps))) * 100)
-        metrics['mean_absolute_percentage_error'] = min(mape, 1e6) if not np.isinf(mape) else 1e6
+        # Percentage errors are undefined for zero targets, so those samples are left out
+        nonzero = y_true != 0
+        n_nonzero = int(np.count_nonzero(nonzero))
+        if n_nonzero:
+            # Divide in place into |y_true|: skipped (zero-target) slots already hold 0
+            percentage_errors = np.abs(y_true)
+            np.divide(abs_residuals, percentage_errors, out=percentage_errors, where=nonzero)
+            mape = percentage_errors.sum().item() / n_nonzero * 100
+            metrics['mean_absolute_percentage_error'] = min(mape, 1e6) if not np.isinf(mape) else 1e6
+        else:
+            metrics['mean_absolute_percentage_error'] = None
     except:
         metrics['mean_absolute_percentage_error'] = None
     
     # Residual statistics
-    residuals = y_true - y_pred
     metrics['residuals'] = {
-        'mean': float(np.mean(residuals)),
-        'std': float(np.std(residuals)),
-        'min': float(np.min(residuals)),
-        'max': float(np.max(residuals))
+        'mean': residuals.mean().item(),
+        'std': residuals.std().item(),
+        'min': residuals.min().item(),
+        'max': residuals.max().item()
     }
     
     return metrics
@@ -97,19 +192,34 @@ def calculate_clustering_metrics(X, labels, true_labels=None):
     """
     metrics = {}
     
+    # Cluster sizes in one pass: bincount for non-negative integer labels, a single sort otherwise
+    labels = np.asarray(labels)
+    if labels.size and np.issubdtype(labels.dtype, np.integer) and labels.min() >= 0:
+        counts = np.bincount(labels)
+        unique_labels = np.flatnonzero(counts)
+        counts = counts[unique_labels]
+    else:
+        unique_labels, counts = np.unique(labels, return_counts=True)
+    
     # Internal metrics (don't require true labels)
-    if len(np.unique(labels)) > 1:  # Need at least 2 clusters
-        metrics['silhouette_score'] = float(silhouette_score(X, labels))
+    if unique_labels.size > 1:  # Need at least 2 clusters
+        from sklearn.metrics import silhouette_score, davies_bouldin_score
+        if len(X) > SILHOUETTE_SAMPLE_SIZE:
+            silhouette = silhouette_score(X, labels, sample_size=SILHOUETTE_SAMPLE_SIZE, random_state=0)
+        else:
+            silhouette = silhouette_score(X, labels)
+        metrics['silhouette_score'] = float(silhouette)
+        # Davies-Bouldin only needs centroid distances, so it stays exact at any size
         metrics['davies_bouldin_score'] = float(davies_bouldin_score(X, labels))
     
     # External metrics (require true labels)
     if true_labels is not None:
+        from sklearn.metrics import adjusted_rand_score
         metrics['adjusted_rand_score'] = float(adjusted_rand_score(true_labels, labels))
     
     # Cluster statistics
-    unique_labels = np.unique(labels)
-    metrics['num_clusters'] = len(unique_labels)
-    metrics['cluster_sizes'] = {str(label): int(np.sum(labels == label)) for label in unique_labels}
+    metrics['num_clusters'] = int(unique_labels.size)
+    metrics['cluster_sizes'] = {str(label): size for label, size in zip(unique_labels.tolist(), counts.tolist())}
     
     return metrics
 
@@ -127,28 +237,41 @@ def calculate_anomaly_detection_metrics(y_true, y_pred, anomaly_scores=None):
     """
     metrics = {}
     
-    # Convert to binary (0 for normal, 1 for anomaly)
-    y_true_binary = (y_true == -1).astype(int)
-    y_pred_binary = (y_pred == -1).astype(int)
+    # One pass over the raw +1/-1 labels yields the whole confusion matrix (anomaly = positive)
+    y_true = np.asarray(y_true).ravel()
+    y_pred = np.asarray(y_pred).ravel()
+    if NUMBA_AVAILABLE:
+        tn, fp, fn, tp = binary_confusion(y_true, y_pred)
+    else:
+        true_anomaly = y_true == -1
+        pred_anomaly = y_pred == -1
+        tp = int(np.count_nonzero(true_anomaly & pred_anomaly))
+        fn = int(np.count_nonzero(true_anomaly)) - tp
+        fp = int(np.count_nonzero(pred_anomaly)) - tp
+        tn = y_true.size - tp - fn - fp
     
-    # Basic classification metrics
-    metrics['accuracy'] = float(accuracy_score(y_true_binary, y_pred_binary))
-    metrics['precision'] = float(precision_score(y_true_binary, y_pred_binary, zero_division=0))
-    metrics['recall'] = float(recall_score(y_true_binary, y_pred_binary, zero_division=0))
-    metrics['f1_score'] = float(f1_score(y_true_binary, y_pred_binary, zero_division=0))
+    # Basic classification metrics (zero_division=0 semantics)
+    total_samples = y_true.size
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    # The counts are Python ints, so these are already native floats
+    metrics['accuracy'] = (tp + tn) / total_samples
+    metrics['precision'] = precision
+    metrics['recall'] = recall
+    metrics['f1_score'] = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
     
-    # Confusion matrix
-    cm = confusion_matrix(y_true_binary, y_pred_binary)
-    metrics['confusion_matrix'] = cm.tolist()
+    # Confusion matrix over the labels that occur, as sklearn's confusion_matrix reports it
+    has_normal = tn + fp + fn > 0
+    has_anomaly = tp + fp + fn > 0
+    if has_normal and has_anomaly:
+        metrics['confusion_matrix'] = [[tn, fp], [fn, tp]]
+    else:
+        metrics['confusion_matrix'] = [[tp if has_anomaly else tn]]
     
     # Anomaly-specific metrics
-    total_samples = len(y_true)
-    predicted_anomalies = np.sum(y_pred_binary)
-    actual_anomalies = np.sum(y_true_binary)
-    
     metrics['anomaly_rate'] = {
-        'predicted': float(predicted_anomalies / total_samples),
-        'actual': float(actual_anomalies / total_samples)
+        'predicted': (tp + fp) / total_samples,
+        'actual': (tp + fn) / total_samples
     }
     
     return metrics
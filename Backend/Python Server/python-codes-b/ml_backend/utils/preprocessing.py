@@ -81,13 +81,35 @@ def preprocess_data(df, features, target=None, preprocessing_steps=None):
     
     return processed_df, feature_encoders, target_encoder
 
-def detect_problem_type(target_series):
+def detect_problem_type(target_series, return_counts=False):
     """
     Automatically detect if the problem is classification or regression
     
     Args:
         target_series: Target column as pandas Series
+        return_counts: Also return the sorted unique target values and their counts
     
+    Returns:
+        'classification' or 'regression', or a (problem_type, unique_values, counts)
+        tuple when return_counts is True
+    """
+    if return_counts:
+        # One pass over the target serves the heuristic and the caller's class statistics
+        value_counts = target_series.value_counts(sort=False).sort_index()
+        problem_type = _problem_type_from_target(target_series, len(value_counts))
+        return problem_type, value_counts.index.to_numpy(), value_counts.to_numpy()
+    
+    return _problem_type_from_target(target_series)
+
+def _problem_type_from_target(target_series, unique_values=None):
+    """
+    Classify a target as classification or regression from its dtype and cardinality
+
+    Args:
+        target_series: Target column as pandas Series
+        unique_values: Number of distinct non-null target values, if the caller has already
+            counted them (e.g. len of a value_counts); computed with nunique() when None
+
     Returns:
         'classification' or 'regression'
     """
@@ -96,7 +118,8 @@ def detect_problem_type(target_series):
         return 'classification'
     
     # If target has <= 10 unique values and is integer, likely classification
-    unique_values = target_series.nunique()
+    if unique_values is None:
+        unique_values = target_series.nunique()
     if unique_values <= 10 and target_series.dtype in [np.int64, np.int32]:
         return 'classification'
     
@@ -1,6 +1,10 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 import os
 import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import logging
 
@@ -8,23 +12,50 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Model pickles can be hundreds of MB: send them as parallel 16 MB multipart uploads
+MB = 1024 * 1024
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * MB,
+    multipart_chunksize=16 * MB,
+    max_concurrency=10,
+    use_threads=True
+)
+# Read buffer for streaming pickles into the uploader (default is 8 KB)
+UPLOAD_READ_BUFFER = 1 * MB
+# A model and its metadata upload at the same time through the shared client
+CONCURRENT_UPLOADS = 2
+# One pooled connection per transfer thread (botocore's default pool holds 10)
+CLIENT_CONFIG = Config(max_pool_connections=CONCURRENT_UPLOADS * TRANSFER_CONFIG.max_concurrency)
+
+# Shared R2 client, set once get_r2_client has created one successfully
+_r2_client = None
+
 def get_r2_client():
     """
     Initialize and return Cloudflare R2 client
+    
+    The client is created once per process and shared (boto3 clients are
+    thread-safe), so the service model and HTTPS connection pool are reused.
+    Failures are not cached: the next call tries again.
     You'll need to set these environment variables:
     - CLOUDFLARE_R2_ACCESS_KEY
     - CLOUDFLARE_R2_SECRET_KEY
     - CLOUDFLARE_R2_ENDPOINT
     - CLOUDFLARE_R2_BUCKET_NAME
     """
+    global _r2_client
+    if _r2_client is not None:
+        return _r2_client
     try:
         client = boto3.client(
             's3',
             endpoint_url=os.getenv('CLOUDFLARE_R2_ENDPOINT'),
             aws_access_key_id=os.getenv('CLOUDFLARE_R2_ACCESS_KEY'),
             aws_secret_access_key=os.getenv('CLOUDFLARE_R2_SECRET_KEY'),
-            region_name='auto'  # Cloudflare R2 uses 'auto'
+            region_name='auto',  # Cloudflare R2 uses 'auto'
+            config=CLIENT_CONFIG
         )
+        _r2_client = client
         return client
     except Exception as e:
         logger.error(f"Failed to initialize R2 client: {e}")
@@ -69,18 +100,22 @@ def upload_to_cloudflare(local_file_path, remote_file_path=None):
         if remote_file_path is None:
             remote_file_path = os.path.basename(local_file_path)
         
+        # One timestamp for both the object metadata and the result
+        uploaded_at = datetime.now().isoformat()
+        
         # Upload file
-        with open(local_file_path, 'rb') as file:
+        with open(local_file_path, 'rb', buffering=UPLOAD_READ_BUFFER) as file:
             client.upload_fileobj(
                 file,
                 bucket_name,
                 remote_file_path,
                 ExtraArgs={
                     'Metadata': {
-                        'uploaded_at': datetime.now().isoformat(),
+                        'uploaded_at': uploaded_at,
                         'original_name': os.path.basename(local_file_path)
                     }
-                }
+                },
+                Config=TRANSFER_CONFIG
             )
         
         # Generate URL (you might need to adjust this based on your R2 setup)
@@ -94,7 +129,7 @@ def upload_to_cloudflare(local_file_path, remote_file_path=None):
             "url": file_url,
             "bucket": bucket_name,
             "key": remote_file_path,
-            "uploaded_at": datetime.now().isoformat()
+            "uploaded_at": uploaded_at
         }
         
     except Exception as e:
@@ -122,21 +157,17 @@ def upload_model_with_metadata(model_id, model_path, metadata_path):
         "uploads": []
     }
     
-    # Upload model file
-    model_result = upload_to_cloudflare(
-        model_path, 
-        f"models/{model_id}.pkl"
-    )
+    # Upload model and metadata concurrently; both are network-bound and share the cached client
+    with ThreadPoolExecutor(max_workers=CONCURRENT_UPLOADS) as executor:
+        model_future = executor.submit(upload_to_cloudflare, model_path, f"models/{model_id}.pkl")
+        metadata_future = executor.submit(upload_to_cloudflare, metadata_path, f"models/{model_id}_metadata.json")
+        model_result = model_future.result()
+        metadata_result = metadata_future.result()
+    
     results["uploads"].append({
         "file_type": "model",
         "result": model_result
     })
-    
-    # Upload metadata file
-    metadata_result = upload_to_cloudflare(
-        metadata_path, 
-        f"models/{model_id}_metadata.json"
-    )
     results["uploads"].append({
         "file_type": "metadata",
         "result": metadata_result
@@ -175,7 +206,7 @@ def download_from_cloudflare(remote_file_path, local_file_path):
         bucket_name = os.getenv('CLOUDFLARE_R2_BUCKET_NAME')
         
         # Download file
-        client.download_file(bucket_name, remote_file_path, local_file_path)
+        client.download_file(bucket_name, remote_file_path, local_file_path, Config=TRANSFER_CONFIG)
         
         logger.info(f"Successfully downloaded {remote_file_path} to {local_file_path}")
         
@@ -207,28 +238,30 @@ def list_models_in_cloud():
         
         bucket_name = os.getenv('CLOUDFLARE_R2_BUCKET_NAME')
         
-        # List objects with 'models/' prefix
-        response = client.list_objects_v2(
+        # List objects with 'models/' prefix; list_objects_v2 returns at most 1000 keys per call
+        paginator = client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
             Bucket=bucket_name,
-            Prefix='models/'
+            Prefix='models/',
+            PaginationConfig={'PageSize': 1000}
         )
         
         models = []
         model_files = {}
         
-        # Group files by model ID
-        for obj in response.get('Contents', []):
-            key = obj['Key']
-            if key.endswith('.pkl'):
-                model_id = os.path.basename(key).replace('.pkl', '')
-                model_files[model_id] = model_files.get(model_id, {})
-                model_files[model_id]['model_file'] = key
-                model_files[model_id]['last_modified'] = obj['LastModified'].isoformat()
-                model_files[model_id]['size'] = obj['Size']
-            elif key.endswith('_metadata.json'):
-                model_id = os.path.basename(key).replace('_metadata.json', '')
-                model_files[model_id] = model_files.get(model_id, {})
-                model_files[model_id]['metadata_file'] = key
+        # Group files by model ID, one page at a time
+        for page in pages:
+            for obj in page.get('Contents', []):
+                key = obj['Key']
+                if key.endswith('.pkl'):
+                    model_id = os.path.basename(key)[:-len('.pkl')]
+                    files = model_files.setdefault(model_id, {})
+                    files['model_file'] = key
+                    files['last_modified'] = obj['LastModified'].isoformat()
+                    files['size'] = obj['Size']
+                elif key.endswith('_metadata.json'):
+                    model_id = os.path.basename(key)[:-len('_metadata.json')]
+                    model_files.setdefault(model_id, {})['metadata_file'] = key
         
         # Convert to list format
         for model_id, files in model_files.items():
@@ -247,6 +280,26 @@ def list_models_in_cloud():
         logger.error(f"Failed to list models: {e}")
         return []
 
+def copy_file(source_path, destination_path):
+    """
+    Copy a file in kernel space with os.copy_file_range, falling back to shutil.copy2
+    
+    Args:
+        source_path: Path of the file to copy
+        destination_path: Path to write the copy to
+    """
+    try:
+        with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+            remaining = os.fstat(source.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(source.fileno(), destination.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    except (AttributeError, OSError):
+        # copy_file_range is Linux-only and fails across some filesystems (ENOSYS, EXDEV)
+        shutil.copy2(source_path, destination_path)
+
 # Fallback function for local development (when R2 is not configured)
 def save_locally(file_path, destination_folder="local_storage"):
     """
@@ -265,9 +318,8 @@ def save_locally(file_path, destination_folder="local_storage"):
         filename = os.path.basename(file_path)
         destination_path = os.path.join(destination_folder, filename)
         
-        # Copy file
-        import shutil
-        shutil.copy2(file_path, destination_path)
+        # Copy file (file contents only; timestamps and permission bits are not needed here)
+        copy_file(file_path, destination_path)
         
         return {
             "status": "success",
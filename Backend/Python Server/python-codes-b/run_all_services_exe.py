@@ -7,12 +7,17 @@ Launches all DataVizAI services in a single process for distribution
 
 import subprocess
 import os
+import errno
+import shutil
 import time
 import signal
+import socket
 import sys
 import codecs
 import threading
 import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Handle PyInstaller bundled app
@@ -44,72 +49,184 @@ if sys.stdout.encoding != 'utf-8':
 if sys.stderr.encoding != 'utf-8':
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
-print("🚀 DataVizAI Combined Services Launcher")
-print(f"📁 Working directory: {BASE_DIR}")
-print(f"⚙️  Mode: {'Executable' if EXECUTABLE_MODE else 'Development'}")
-print("🌟 Starting All Flask Services...")
-print("=" * 60)
+# Parent-side read buffer for service stdout/stderr pipes
+PIPE_BUFFER_SIZE = 64 * 1024
+# Startup readiness: probe each service port for up to 10 s, backing off from 5 ms to 50 ms
+STARTUP_TIMEOUT = 10
+STARTUP_POLL_INTERVAL = 0.05
+STARTUP_MIN_POLL_INTERVAL = 0.005
+# Without signal.pause (Windows) the idle main thread wakes this rarely; Ctrl+C still interrupts the sleep
+IDLE_SLEEP_SECONDS = 3600
+# Seconds services get to exit after terminate() before they are killed
+SHUTDOWN_TIMEOUT = 5
+# Development-mode interpreter, looked up on PATH once rather than by every launch
+PYTHON_EXECUTABLE = shutil.which("python") or "python"
+# Seconds to let output forwarders flush what a stopped service left in its pipes
+OUTPUT_DRAIN_TIMEOUT = 1
+# Recent stderr lines kept per subprocess and repeated if it stops while running
+STDERR_TAIL_LINES = 50
 
-# Store subprocesses and threads for cleanup
+# DATAVIZAI_SINGLE_PORT=1 mounts all services in one process on one port (path routing)
+SINGLE_PORT_MODE = os.getenv('DATAVIZAI_SINGLE_PORT') == '1'
+SINGLE_PORT = 5000
+SERVICE_MOUNTS = {
+    '/quality': "Data Quality",
+    '/preprocessing': "Data Preprocessing",
+    '/gans': "GANs Service",
+}
+
+# Store service processes (subprocesses or multiprocessing workers), threads and
+# subprocess output forwarders for cleanup
 processes = []
 service_threads = []
+output_threads = []
+# Bounded tail of each subprocess's stderr, by service name
+stderr_tails = {}
+
+def prepend_sys_path(path):
+    """
+    Put a directory at the front of sys.path unless it is already there
+    
+    In single-port mode every service loads into one interpreter; re-inserting the
+    same directory would make each later import search it repeatedly.
+    """
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
-def run_service_in_process(service_name, module_path, port):
-    """Run a service in a separate process (for executable mode)"""
+def load_service_app(service_name):
+    """
+    Import a service module and return its Flask app
+    
+    Args:
+        service_name: One of the launcher's service names
+    
+    Returns:
+        The service's Flask application object
+    """
+    if service_name == "ML Backend":
+        from ml_backend.app import app
+        return app
+    elif service_name == "Data Quality":
+        # Import and run metric-quality app
+        metric_quality_path = os.path.join(BASE_DIR, 'metric-quality')
+        prepend_sys_path(BASE_DIR)
+        
+        # Dynamically load the module
+        import importlib.util
+        spec = importlib.util.spec_from_file_location("app", os.path.join(metric_quality_path, "app.py"))
+        metric_quality_module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(metric_quality_module)
+        return metric_quality_module.app
+    elif service_name == "Data Preprocessing":
+        # Import and run preprocessing app
+        preprocessing_path = os.path.join(BASE_DIR, 'pre-processing')
+        prepend_sys_path(BASE_DIR)
+        
+        # Dynamically load the module
+        import importlib.util
+        spec = importlib.util.spec_from_file_location("preprocessing_api", os.path.join(preprocessing_path, "preprocessing_api.py"))
+        preprocessing_module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(preprocessing_module)
+        return preprocessing_module.app
+    elif service_name == "GANs Service":
+        # Import and run GANs app
+        prepend_sys_path(os.path.join(BASE_DIR, 'gans'))
+        import gans
+        return gans.app
+    raise ValueError(f"Unknown service: {service_name}")
+
+def run_service_in_process(service_name, module_path, port, ready=None):
+    """
+    Run a service in a separate process (for executable mode)
+    
+    make_server binds the port before returning, so ready is set only once the
+    service can accept connections (and a port clash fails right here).
+    """
     try:
-        if service_name == "ML Backend":
-            from ml_backend.app import app
-            app.run(debug=False, host='0.0.0.0', port=port, use_reloader=False, threaded=True)
-        elif service_name == "Data Quality":
-            # Import and run metric-quality app
-            metric_quality_path = os.path.join(BASE_DIR, 'metric-quality')
-            sys.path.insert(0, BASE_DIR)
-            
-            # Dynamically load the module
-            import importlib.util
-            spec = importlib.util.spec_from_file_location("app", os.path.join(metric_quality_path, "app.py"))
-            metric_quality_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(metric_quality_module)
-            
-            # Run the Flask app
-            metric_quality_module.app.run(debug=False, host='0.0.0.0', port=port, use_reloader=False, threaded=True)
-        elif service_name == "Data Preprocessing":
-            # Import and run preprocessing app
-            preprocessing_path = os.path.join(BASE_DIR, 'pre-processing')
-            sys.path.insert(0, BASE_DIR)
-            
-            # Dynamically load the module
-            import importlib.util
-            spec = importlib.util.spec_from_file_location("preprocessing_api", os.path.join(preprocessing_path, "preprocessing_api.py"))
-            preprocessing_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(preprocessing_module)
-            
-            # Run the Flask app
-            preprocessing_module.app.run(debug=False, host='0.0.0.0', port=port, use_reloader=False, threaded=True)
-        elif service_name == "GANs Service":
-            # Import and run GANs app
-            sys.path.insert(0, os.path.join(BASE_DIR, 'gans'))
-            import gans
-            gans.app.run(debug=False, host='0.0.0.0', port=port, use_reloader=False, threaded=True)
+        from werkzeug.serving import make_server
+        
+        app = load_service_app(service_name)
+        server = make_server('0.0.0.0', port, app, threaded=True)
+        if ready is not None:
+            ready.set()
+        server.serve_forever()
     except Exception as e:
         print(f"❌ {service_name} failed to start: {e}")
 
+def serve_single_port(port=SINGLE_PORT, ready=None):
+    """
+    Serve every service from one process and port, mounted by path prefix
+    
+    The ML Backend stays at the root; the other apps live under SERVICE_MOUNTS.
+    ready is set as soon as the port is bound.
+    """
+    try:
+        from werkzeug.middleware.dispatcher import DispatcherMiddleware
+        from werkzeug.serving import make_server
+        
+        mounts = {prefix: load_service_app(name) for prefix, name in SERVICE_MOUNTS.items()}
+        combined_app = DispatcherMiddleware(load_service_app("ML Backend"), mounts)
+        server = make_server('0.0.0.0', port, combined_app, threaded=True)
+        if ready is not None:
+            ready.set()
+        server.serve_forever()
+    except Exception as e:
+        print(f"❌ Combined services failed to start: {e}")
+
+def wait_for_port(port, is_running, ready=None, timeout=STARTUP_TIMEOUT):
+    """
+    Wait until a service accepts connections on its port
+    
+    Args:
+        port: Port the service listens on
+        is_running: Callable returning False once the service has exited
+        ready: Optional Event the service sets once its port is bound; when given
+            it is waited on instead of probing the port
+        timeout: Maximum number of seconds to wait
+    
+    Returns:
+        True as soon as the port accepts a connection, False if the service
+        exits or the timeout expires first
+    """
+    deadline = time.monotonic() + timeout
+    delay = STARTUP_MIN_POLL_INTERVAL
+    while time.monotonic() < deadline:
+        if not is_running():
+            # The service may have bound its port and then stopped between checks
+            return ready is not None and ready.is_set()
+        if ready is not None:
+            if ready.wait(STARTUP_POLL_INTERVAL):
+                return True
+            continue
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            probe.settimeout(STARTUP_POLL_INTERVAL)
+            result = probe.connect_ex(('127.0.0.1', port))
+        if result == 0:
+            return True
+        if result == errno.ECONNREFUSED:
+            # Nothing listening yet: retry quickly at first, then settle at the regular interval
+            time.sleep(delay)
+            delay = min(delay * 2, STARTUP_POLL_INTERVAL)
+        elif result != errno.EWOULDBLOCK:
+            time.sleep(STARTUP_POLL_INTERVAL)
+        # EWOULDBLOCK means the probe itself timed out and has already waited
+    return False
+
 def launch_service_executable(name, module_path, port):
-    """Launch service in executable mode using threading"""
+    """Launch service in executable mode in its own process"""
     print(f"🔄 {name} starting on port {port}...")
     
-    # Create and start thread for this service
-    thread = threading.Thread(
+    # A separate interpreter per service, so CPU-bound requests don't contend for one GIL.
+    # Not daemonic: services such as the bagged SVM start worker processes of their own.
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(
         target=run_service_in_process,
-        args=(name, module_path, port),
-        daemon=True
+        args=(name, module_path, port, ready),
+        name=name
     )
-    thread.start()
-    service_threads.append((name, thread))
-    
-    # Wait a moment to check if service started
-    time.sleep(2)
-    print(f"✅ {name}: RUNNING")
+    process.start()
+    processes.append((name, process))
+    return name, port, process.is_alive, ready, None
 
 def launch_service_development(name, rel_path, port):
     """Launch service in development mode using subprocess"""
@@ -126,95 +243,258 @@ def launch_service_development(name, rel_path, port):
     env['PYTHONIOENCODING'] = 'utf-8'
     env['PYTHONLEGACYWINDOWSSTDIO'] = '0'
     env['PYTHONUTF8'] = '1'
+    # The output forwarders echo each line as it arrives, so children must not block-buffer the pipe
+    env['PYTHONUNBUFFERED'] = '1'
 
     # Launch service in background with correct working directory and UTF-8 support
     process = subprocess.Popen(
-        ["python", "-u", service_file],  # -u for unbuffered output
+        [PYTHON_EXECUTABLE, service_file],
         cwd=service_dir,  # Set working directory to service directory
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
+        bufsize=PIPE_BUFFER_SIZE,  # Read service output in 64 KB chunks, not per line
         encoding='utf-8',
         env=env  # Pass UTF-8 environment variables
     )
     processes.append((name, process))
+    
+    # Keep both pipes drained: a service that fills a pipe buffer would block on its next write
+    stderr_tails[name] = deque(maxlen=STDERR_TAIL_LINES)
+    for stream, target, tail in ((process.stdout, sys.stdout, None), (process.stderr, sys.stderr, stderr_tails[name])):
+        forwarder = threading.Thread(target=forward_output, args=(name, stream, target, tail), daemon=True)
+        forwarder.start()
+        output_threads.append((name, forwarder))
+    return name, port, lambda: process.poll() is None, None, process
 
-    # Wait briefly and check if still running
-    time.sleep(3)  # Increased wait time for startup
-    if process.poll() is None:
-        print(f"✅ {name}: HEALTHY (running)")
-    else:
-        stdout, stderr = process.communicate()
-        print(f"❌ {name} failed to start.")
-        print("📄 STDOUT:")
-        print(stdout if stdout else "No output")
-        print("⚠️  STDERR:")
-        print(stderr if stderr else "No errors")
-
-try:
-    if EXECUTABLE_MODE:
-        # Running as executable - use threading
-        print("🔧 Running in executable mode with multi-threading")
-        launch_service_executable("ML Backend", "ml_backend.app", 5000)
-        launch_service_executable("Data Quality", "metric-quality.app", 1289)
-        launch_service_executable("Data Preprocessing", "pre-processing.preprocessing_api", 1290)
-        launch_service_executable("GANs Service", "gans.gans", 4321)
-    else:
-        # Running as script - use subprocess
-        print("🔧 Running in development mode with subprocesses")
-        launch_service_development("ML Backend", "ml_backend/app.py", 5000)
-        launch_service_development("Data Quality", "metric-quality/app.py", 1289)
-        launch_service_development("Data Preprocessing", "pre-processing/preprocessing_api.py", 1290)
-        launch_service_development("GANs Service", "gans/gans.py", 4321)
+def forward_output(name, stream, target, tail=None):
+    """
+    Copy a service's output to the launcher console line by line (runs in a daemon thread)
+    
+    Args:
+        name: Service name used to tag each line
+        stream: Text pipe from the service process
+        target: Stream to write the tagged lines to
+        tail: Optional bounded deque that keeps the most recent lines
+    """
+    try:
+        for line in iter(stream.readline, ''):
+            print(f"[{name}] {line}", end='', file=target)
+            if tail is not None:
+                tail.append(line)
+    except (OSError, ValueError):
+        pass  # Pipe closed during shutdown
+    finally:
+        stream.close()
 
-    print("=" * 60)
-    print("🌐 SERVICE ENDPOINTS:")
-    print("🤖 ML Backend:          http://localhost:5000")
-    print("📊 Data Quality:        http://localhost:1289")
-    print("🔧 Data Preprocessing:  http://localhost:1290")
-    print("🎨 GANs Service:        http://localhost:4321")
-    print("=" * 60)
-    print("⚠️  Press Ctrl+C to stop all services")
-    print("📱 Open your web browser and navigate to your frontend application")
-    print("🔗 The services are now ready to accept requests!")
+def drain_output(name=None, timeout=OUTPUT_DRAIN_TIMEOUT):
+    """Wait briefly for the output forwarders of one service (or all services) to finish"""
+    for service_name, forwarder in output_threads:
+        if name is None or service_name == name:
+            forwarder.join(timeout)
 
-    # Keep script running
-    if EXECUTABLE_MODE:
-        # In executable mode, wait for threads
+def wait_for_services(launched):
+    """
+    Check every launched service for readiness, probing all ports concurrently
+    
+    Startup takes as long as the slowest service rather than the sum of all of them.
+    
+    Args:
+        launched: List of (name, port, is_running, ready, process) tuples from the
+            launch functions; ready is None where the port has to be probed, and
+            process is None unless the service runs as a subprocess
+    """
+    with ThreadPoolExecutor(max_workers=len(launched)) as executor:
+        futures = {
+            executor.submit(wait_for_port, port, is_running, ready): (name, port, is_running, process)
+            for name, port, is_running, ready, process in launched
+        }
+        for future in as_completed(futures):
+            name, port, is_running, process = futures[future]
+            if future.result():
+                print(f"✅ {name}: HEALTHY (running)")
+            elif is_running():
+                print(f"⚠️  {name}: still starting (port {port} not open after {STARTUP_TIMEOUT}s)")
+            elif process is not None:
+                # Its output, including any traceback, has been forwarded above
+                drain_output(name)
+                print(f"❌ {name} failed to start (exit code {process.returncode}).")
+            else:
+                print(f"❌ {name} failed to start.")
+
+def watch_service(name, wait, describe_exit):
+    """
+    Block on a service until it stops, then report it (runs in a daemon thread)
+    
+    Args:
+        name: Service name
+        wait: Callable that blocks until the service stops
+        describe_exit: Callable returning a description of how it stopped
+    """
+    wait()
+    print(f"⚠️  {name} {describe_exit()}")
+    
+    # Other services keep logging to the same console, so repeat this one's last errors
+    if name in stderr_tails:
+        drain_output(name)
+        tail = list(stderr_tails[name])
+        if tail:
+            print(f"📄 Last {len(tail)} stderr lines from {name}:")
+            print(''.join(tail), end='')
+
+def stop_processes(processes, timeout=SHUTDOWN_TIMEOUT):
+    """
+    Terminate service processes and wait for them to exit, killing any that hang
+    
+    All processes are signalled first and then share one deadline, so shutdown
+    takes at most timeout seconds rather than timeout per service.
+    
+    Args:
+        processes: List of (name, process) tuples holding subprocess.Popen or
+            multiprocessing.Process objects
+        timeout: Seconds to wait for a clean exit before killing
+    """
+    for name, process in processes:
         try:
-            while True:
-                time.sleep(1)
-                # Check if any threads have died
-                for name, thread in service_threads:
-                    if not thread.is_alive():
-                        print(f"⚠️  {name} thread has stopped")
-        except KeyboardInterrupt:
-            print("\n🛑 Stopping all services...")
-            print("👋 Goodbye!")
-    else:
-        # In development mode, wait for processes
-        while True:
-            time.sleep(1)
-
-except KeyboardInterrupt:
-    print("\n🛑 Stopping all services...")
-    
-    if EXECUTABLE_MODE:
-        print("🔄 Stopping service threads...")
-        # In executable mode, threads will stop when main process stops
-    else:
-        print("🔄 Terminating service processes...")
-        for name, process in processes:
-            try:
-                process.terminate()
+            process.terminate()
+        except OSError:
+            pass  # Already exited
+    
+    deadline = time.monotonic() + timeout
+    for name, process in processes:
+        remaining = max(0, deadline - time.monotonic())
+        try:
+            if isinstance(process, multiprocessing.Process):
+                process.join(remaining)
+                exited = not process.is_alive()
+            else:
+                try:
+                    process.wait(timeout=remaining)
+                    exited = True
+                except subprocess.TimeoutExpired:
+                    exited = False
+            
+            if exited:
                 print(f"✅ {name} terminated.")
-            except:
-                print(f"⚠️  Failed to terminate {name}")
+            else:
+                process.kill()
+                process.join() if isinstance(process, multiprocessing.Process) else process.wait()
+                print(f"⚠️  {name} did not exit within {timeout}s and was killed.")
+        except Exception:
+            print(f"⚠️  Failed to terminate {name}")
+
+def wait_until_interrupted():
+    """Block the main thread until Ctrl+C without periodic polling"""
+    while True:
+        if hasattr(signal, 'pause'):
+            signal.pause()
+        else:
+            time.sleep(IDLE_SLEEP_SECONDS)
+
+def main():
+    """Launch every service and keep them running until Ctrl+C"""
+    print("🚀 DataVizAI Combined Services Launcher")
+    print(f"📁 Working directory: {BASE_DIR}")
+    print(f"⚙️  Mode: {'Executable' if EXECUTABLE_MODE else 'Development'}")
+    print("🌟 Starting All Flask Services...")
+    print("=" * 60)
+    
+    exit_code = 0
+    try:
+        if SINGLE_PORT_MODE:
+            # One interpreter and one server: numpy/sklearn/torch are loaded once, not per service
+            print(f"🔧 Running all services in one process on port {SINGLE_PORT}")
+            ready = threading.Event()
+            thread = threading.Thread(target=serve_single_port, kwargs={'ready': ready}, daemon=True)
+            thread.start()
+            service_threads.append(("Combined services", thread))
+            launched = [("Combined services", SINGLE_PORT, thread.is_alive, ready, None)]
+        elif EXECUTABLE_MODE:
+            # Running as executable - one multiprocessing worker per service
+            print("🔧 Running in executable mode with one process per service")
+            launched = [
+                launch_service_executable("ML Backend", "ml_backend.app", 5000),
+                launch_service_executable("Data Quality", "metric-quality.app", 1289),
+                launch_service_executable("Data Preprocessing", "pre-processing.preprocessing_api", 1290),
+                launch_service_executable("GANs Service", "gans.gans", 4321),
+            ]
+        else:
+            # Running as script - use subprocess
+            print("🔧 Running in development mode with subprocesses")
+            launched = [
+                launch_service_development("ML Backend", "ml_backend/app.py", 5000),
+                launch_service_development("Data Quality", "metric-quality/app.py", 1289),
+                launch_service_development("Data Preprocessing", "pre-processing/preprocessing_api.py", 1290),
+                launch_service_development("GANs Service", "gans/gans.py", 4321),
+            ]
+    
+        # All services start together; check them all at once
+        wait_for_services(launched)
+
+        print("=" * 60)
+        print("🌐 SERVICE ENDPOINTS:")
+        if SINGLE_PORT_MODE:
+            print(f"🤖 ML Backend:          http://localhost:{SINGLE_PORT}")
+            print(f"📊 Data Quality:        http://localhost:{SINGLE_PORT}/quality")
+            print(f"🔧 Data Preprocessing:  http://localhost:{SINGLE_PORT}/preprocessing")
+            print(f"🎨 GANs Service:        http://localhost:{SINGLE_PORT}/gans")
+        else:
+            print("🤖 ML Backend:          http://localhost:5000")
+            print("📊 Data Quality:        http://localhost:1289")
+            print("🔧 Data Preprocessing:  http://localhost:1290")
+            print("🎨 GANs Service:        http://localhost:4321")
+        print("=" * 60)
+        print("⚠️  Press Ctrl+C to stop all services")
+        print("📱 Open your web browser and navigate to your frontend application")
+        print("🔗 The services are now ready to accept requests!")
+
+        # Keep script running; watcher threads block on each service and report when it stops
+        for name, thread in service_threads:
+            threading.Thread(
+                target=watch_service,
+                args=(name, thread.join, lambda: "thread has stopped"),
+                daemon=True
+            ).start()
+        # Processes that failed at startup were already reported
+        for name, process in processes:
+            if isinstance(process, multiprocessing.Process):
+                if process.is_alive():
+                    threading.Thread(
+                        target=watch_service,
+                        args=(name, process.join, lambda p=process: f"process has stopped (exit code {p.exitcode})"),
+                        daemon=True
+                    ).start()
+            elif process.poll() is None:
+                threading.Thread(
+                    target=watch_service,
+                    args=(name, process.wait, lambda p=process: f"process has stopped (exit code {p.returncode})"),
+                    daemon=True
+                ).start()
+        wait_until_interrupted()
+
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping all services...")
+
+    except Exception as e:
+        print(f"❌ Fatal error: {e}")
+        import traceback
+        traceback.print_exc()
+        exit_code = 1
+
+    finally:
+        # Executable-mode services are non-daemon processes: exiting without stopping them
+        # would hang in multiprocessing's exit handler (and orphan development-mode children)
+        if service_threads:
+            print("🔄 Stopping service threads...")
+            # Service threads stop when the main process stops
+        if processes:
+            print("🔄 Terminating service processes...")
+            stop_processes(processes)
+            drain_output()
     
     print("👋 All services stopped. Goodbye!")
-    sys.exit(0)
+    sys.exit(exit_code)
 
-except Exception as e:
-    print(f"❌ Fatal error: {e}")
-    import traceback
-    traceback.print_exc()
-    sys.exit(1)
+if __name__ == "__main__":
+    # Service processes re-import this module (spawn / PyInstaller), so launching only happens here
+    multiprocessing.freeze_support()
+    main()
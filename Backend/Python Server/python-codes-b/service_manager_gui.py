@@ -1,15 +1,18 @@
-import subprocess
+import asyncio
 import os
-import time
 import signal
 import sys
 import codecs
 import tkinter as tk
 from tkinter import ttk
 import threading
+import shutil
 import webbrowser
 from datetime import datetime
 
+# Interpreter for the services, looked up on PATH once rather than by every launch
+PYTHON_EXECUTABLE = shutil.which("python") or "python"
+
 class ServiceLauncher(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -127,9 +130,16 @@ class ServiceLauncher(tk.Tk):
         )
         self.stop_btn.pack(side=tk.RIGHT, padx=5)
 
-        # Start services in a separate thread
+        # Start services on a dedicated asyncio loop so launches overlap
         self.processes = []
-        threading.Thread(target=self.start_services, daemon=True).start()
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.run_event_loop, daemon=True).start()
+
+    def run_event_loop(self):
+        """Run the asyncio loop that owns the service subprocesses"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.start_services())
+        self.loop.run_forever()
 
     def update_service_status(self, service, status, color):
         """Update the status dot and label for a service"""
@@ -138,55 +148,70 @@ class ServiceLauncher(tk.Tk):
             text=f"{service} (Port: {self.services[service]['port']}) - {status}"
         )
 
-    def start_services(self):
-        """Start all services in sequence"""
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        total_services = len(self.services)
-        progress_step = 100 / total_services
+    async def launch_service(self, base_dir, service_name, service_info):
+        """Launch a single service and check it survives its startup window"""
+        self.after(0, self.update_service_status, service_name, "Starting...", "yellow")
 
-        for i, (service_name, service_info) in enumerate(self.services.items(), 1):
-            self.status_label.configure(text=f"Starting {service_name}...")
-            self.update_service_status(service_name, "Starting...", "yellow")
+        try:
+            full_path = os.path.join(base_dir, service_info["path"])
+            service_dir = os.path.dirname(full_path)
+            service_file = os.path.basename(full_path)
+
+            env = os.environ.copy()
+            env['PYTHONIOENCODING'] = 'utf-8'
+            env['PYTHONLEGACYWINDOWSSTDIO'] = '0'
+            env['PYTHONUTF8'] = '1'
+            # Output is discarded, so let children block-buffer stdout (any non-empty value would mean -u)
+            env.pop('PYTHONUNBUFFERED', None)
+
+            # Nothing here reads service output; an unread pipe would block a service once it filled up
+            process = await asyncio.create_subprocess_exec(
+                PYTHON_EXECUTABLE, service_file,
+                cwd=service_dir,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                env=env
+            )
+
+            self.service_labels[service_name]["process"] = process
+            self.processes.append((service_name, process))
 
+            # A service that exits within the startup window has failed
             try:
-                full_path = os.path.join(base_dir, service_info["path"])
-                service_dir = os.path.dirname(full_path)
-                service_file = os.path.basename(full_path)
-
-                env = os.environ.copy()
-                env['PYTHONIOENCODING'] = 'utf-8'
-                env['PYTHONLEGACYWINDOWSSTDIO'] = '0'
-                env['PYTHONUTF8'] = '1'
-
-                process = subprocess.Popen(
-                    ["python", "-u", service_file],
-                    cwd=service_dir,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    encoding='utf-8',
-                    env=env
-                )
-
-                self.service_labels[service_name]["process"] = process
-                self.processes.append((service_name, process))
-
-                # Wait briefly and check if still running
-                time.sleep(2)
-                if process.poll() is None:
-                    self.update_service_status(service_name, "HEALTHY", "green")
-                else:
-                    self.update_service_status(service_name, "FAILED", "red")
-
-            except Exception as e:
-                self.update_service_status(service_name, f"ERROR: {str(e)}", "red")
-
-            self.progress_var.set(i * progress_step)
+                await asyncio.wait_for(process.wait(), timeout=2)
+                self.after(0, self.update_service_status, service_name, "FAILED", "red")
+            except asyncio.TimeoutError:
+                self.after(0, self.update_service_status, service_name, "HEALTHY", "green")
+
+        except Exception as e:
+            self.after(0, self.update_service_status, service_name, f"ERROR: {str(e)}", "red")
+
+    async def start_services(self):
+        """Start all services concurrently"""
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        progress_step = 100 / len(self.services)
+        completed = 0
+
+        async def launch_and_report(service_name, service_info):
+            nonlocal completed
+            await self.launch_service(base_dir, service_name, service_info)
+            completed += 1
+            self.after(0, self.progress_var.set, completed * progress_step)
+
+        self.after(0, lambda: self.status_label.configure(text="Starting all services..."))
+        await asyncio.gather(*(
+            launch_and_report(service_name, service_info)
+            for service_name, service_info in self.services.items()
+        ))
 
         all_healthy = all(
-            process.poll() is None
+            process.returncode is None
             for _, process in self.processes
         )
+        self.after(0, self.finish_startup, all_healthy)
 
+    def finish_startup(self, all_healthy):
+        """Enable the controls once every launch has been checked"""
         if all_healthy:
             self.status_label.configure(
                 text="All services are running. You can now access the endpoints."
@@ -206,11 +231,13 @@ class ServiceLauncher(tk.Tk):
     def stop_services(self):
         """Stop all running services"""
         self.status_label.configure(text="Stopping all services...")
-        for service_name, process in self.processes:
-            try:
-                process.terminate()
+        try:
+            # The subprocesses belong to the event loop, so terminate them there
+            asyncio.run_coroutine_threadsafe(self.terminate_services(), self.loop).result(timeout=5)
+            for service_name, _ in self.processes:
                 self.update_service_status(service_name, "Stopped", "gray")
-            except:
+        except Exception:
+            for service_name, _ in self.processes:
                 self.update_service_status(service_name, "Force stopped", "red")
 
         self.status_label.configure(text="All services stopped.")
@@ -218,6 +245,15 @@ class ServiceLauncher(tk.Tk):
         self.stop_btn.configure(state=tk.DISABLED)
         self.quit()
 
+    async def terminate_services(self):
+        """Send terminate to every service that is still running"""
+        for _, process in self.processes:
+            if process.returncode is None:
+                try:
+                    process.terminate()
+                except ProcessLookupError:
+                    pass
+
     def on_closing(self):
         """Handle window close event"""
         self.stop_services()
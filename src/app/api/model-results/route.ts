@@ -2,6 +2,22 @@ import { NextRequest, NextResponse } from 'next/server';
 import fs from 'fs';
 import path from 'path';
 
+type PreviewRecord = Record<string, unknown>;
+
+// anomaly_preview is stored column-oriented ({ columns, data }); older metadata has one record per row
+function toPreviewRecords(preview: unknown): PreviewRecord[] {
+  if (Array.isArray(preview)) {
+    return preview as PreviewRecord[];
+  }
+  if (preview && typeof preview === 'object' && 'columns' in preview && 'data' in preview) {
+    const { columns, data } = preview as { columns: string[]; data: unknown[][] };
+    return data.map((row) =>
+      Object.fromEntries(columns.map((column, i) => [column, row[i]]))
+    );
+  }
+  return [];
+}
+
 export async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url);
@@ -29,6 +45,8 @@ export async function GET(request: NextRequest) {
     const metadataContent = fs.readFileSync(metadataPath, 'utf-8');
     const metadata = JSON.parse(metadataContent);
 
+    const anomalyPreview = toPreviewRecords(metadata.metrics?.anomaly_preview);
+
     // Extract key information for the UI
     const modelResults = {
       // Basic model info
@@ -100,11 +118,11 @@ export async function GET(request: NextRequest) {
       
       // Anomaly detection specific data
       ...(metadata.task_type === 'anomaly_detection' && {
-        anomaly_labels: metadata.metrics?.anomaly_preview?.map((item: { anomaly_label: number }) => item.anomaly_label) || [],
+        anomaly_labels: anomalyPreview.map((item) => item.anomaly_label as number),
         anomalies_detected: metadata.metrics?.anomalies_detected,
         anomaly_detection_rate: metadata.metrics?.anomaly_detection_rate,
         contamination: metadata.hyperparams?.contamination,
-        anomaly_preview: metadata.metrics?.anomaly_preview || []
+        anomaly_preview: anomalyPreview
       }),
       
       // Performance summary